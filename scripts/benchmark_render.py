@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit"))
+import data_store
+import export_snapshots
+
+# Client-side cost of the dashboard spec: the spec from charts.get_visualization is rendered
+# headlessly with vl-convert (same Vega parse + dataflow + scenegraph work as the browser),
+# as a whole and per top-level section. Each section is rendered on its own with the shared
+# config, params and only the datasets it references. Selections defined in another section
+# are attached to an empty 1x1 anchor view so the section still parses.
+#
+#   python scripts/benchmark_render.py [--repeat N] [--save report.json] [--baseline report.json]
+
+FULL_DASHBOARD = 'Full dashboard'
+TOLERANCE = 0.5  # Allowed render time increase over the baseline (headless timings vary by ~20%)
+
+
+# SECTIONS
+
+def get_sections(spec):
+    # Layout of final_dashboard: vconcat(hconcat(vconcat(q1_row, q5_2), vconcat(q4, q5_1)), q2[, q6])
+    left_side, right_side = spec['vconcat'][0]['hconcat']
+    sections = {
+        'Q1 row': left_side['vconcat'][0],
+        'Q5.2': left_side['vconcat'][1],
+        'Q4/Q5.1': right_side,
+        'Q2': spec['vconcat'][1]
+    }
+    if len(spec['vconcat']) > 2:
+        sections['Q6'] = spec['vconcat'][2]
+    return sections
+
+def walk(node):
+    yield node
+    children = node.values() if isinstance(node, dict) else node if isinstance(node, list) else []
+    for child in children:
+        yield from walk(child)
+
+def get_view_names(section):
+    return {node['name'] for node in walk(section) if isinstance(node, dict) and 'mark' in node and 'name' in node}
+
+def get_dataset_names(section):
+    return {
+        node['data']['name'] for node in walk(section)
+        if isinstance(node, dict) and isinstance(node.get('data'), dict) and 'name' in node['data']
+    }
+
+def build_section_spec(spec, section):
+    views = get_view_names(section)
+    anchors = [
+        {
+            'name': view,
+            'data': {'values': []},
+            'mark': 'point',
+            'encoding': {'x': {'field': param['select']['fields'][0], 'type': 'nominal'}},
+            'width': 1, 'height': 1
+        }
+        for param in spec['params'] for view in param.get('views', []) if view not in views
+    ]
+    section_spec = {key: spec[key] for key in ['$schema', 'config', 'params'] if key in spec}
+    section_spec['datasets'] = {name: spec['datasets'][name] for name in sorted(get_dataset_names(section))}
+    section_spec['vconcat'] = [section] + anchors
+    return section_spec
+
+
+# BENCHMARK
+
+def time_render(spec, repeat, fmt):
+    import vl_convert as vlc
+
+    render = vlc.vegalite_to_png if fmt == 'png' else vlc.vegalite_to_svg
+    render(spec, vl_version=export_snapshots.VL_VERSION)  # Warm-up (engine startup, remote topojson)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(spec, vl_version=export_snapshots.VL_VERSION)
+        times.append(time.perf_counter() - start)
+    return times
+
+def get_spec_stats(spec, section):
+    datasets = get_dataset_names(section)
+    return {
+        'SpecBytes': len(json.dumps(spec, separators=(',', ':')).encode('utf-8')),
+        'Datasets': len(datasets),
+        'InlineRows': sum(len(spec['datasets'][name]) for name in datasets),
+        'Views': len([node for node in walk(section) if isinstance(node, dict) and 'mark' in node])
+    }
+
+def run_benchmark(spec, repeat=5, fmt='svg'):
+    specs = {FULL_DASHBOARD: (spec, spec)}
+    for name, section in get_sections(spec).items():
+        specs[name] = (build_section_spec(spec, section), section)
+
+    report = []
+    for name, (render_spec, section) in specs.items():
+        times = time_render(render_spec, repeat, fmt)
+        report.append({
+            'Section': name,
+            'MedianMs': round(1000 * pd.Series(times).median(), 1),
+            'MinMs': round(1000 * min(times), 1),
+            **get_spec_stats(render_spec, section)
+        })
+    return pd.DataFrame(report)
+
+def compare_to_baseline(report, baseline, tolerance=TOLERANCE):
+    # Sections whose median render time grew by more than the tolerance
+    merged = report.merge(baseline[['Section', 'MedianMs']], on='Section', suffixes=('', 'Baseline'))
+    merged['Change'] = (merged['MedianMs'] / merged['MedianMsBaseline'] - 1).round(3)
+    return merged[merged['Change'] > tolerance]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the headless render time of the dashboard spec, per section.")
+    parser.add_argument('--repeat', type=int, default=5, help="timed renders per section (after one warm-up render)")
+    parser.add_argument('--format', choices=['svg', 'png'], default='svg')
+    parser.add_argument('--save', help="write the report to this JSON file")
+    parser.add_argument('--baseline', help="fail if a section renders slower than in this saved report")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed relative slowdown over the baseline")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)  # charts reads clean_data/ relative to the project root
+    spec = export_snapshots.build_spec(export_snapshots.load_frames(data_store.get_dashboard_years()))
+    report = run_benchmark(spec, args.repeat, args.format)
+    print(report.to_string(index=False))
+
+    if args.save:
+        report.to_json(args.save, orient='records', indent=2)
+        print(f"Report saved to: {args.save}")
+    if args.baseline:
+        regressions = compare_to_baseline(report, pd.read_json(args.baseline), args.tolerance)
+        if not regressions.empty:
+            print("Render time regressions:")
+            print(regressions[['Section', 'MedianMsBaseline', 'MedianMs', 'Change']].to_string(index=False))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit"))
+import artifacts
+import charts
+import cube
+import data_store
+import institutions
+import sketches
+import timeseries
+from chart_config import YEAR_ALL_INDICATOR
+
+# Run after process_cancellations.py: writes the clean and derived dashboard frames
+# as a versioned Arrow bundle (clean_data/dashboard/) memory-mapped by the app at startup.
+
+
+def build_frames(years, df_awards=None, df_cancellations=None):
+    # df_awards / df_cancellations: handed over in memory by the ETL pipeline, otherwise read from clean_data/
+    mappings = charts.get_mappings()
+    frames = cube.get_dashboard_frames(mappings, years, df_awards, df_cancellations)
+    combined_q5_with_states, q5_segments = charts.get_q5_evolution_data(frames['df_state_grants'])
+    frames['combined_q5_with_states'] = combined_q5_with_states
+    frames['q5_segments'] = q5_segments
+    frames['df_complete'] = charts.get_award_data(mappings, years, df_awards, df_cancellations)
+    frames['budget_sketches'] = sketches.build_sketches(mappings, years, df_awards, df_cancellations)
+    frames['budget_quantiles'] = sketches.get_budget_quantiles(frames['budget_sketches'])
+    frames['institution_stats'] = institutions.build_institution_stats(years, df_awards, df_cancellations)
+    try:
+        frames['monthly_series'] = timeseries.build_monthly_series(mappings, years, df_awards, df_cancellations)
+    except (ValueError, KeyError):  # Files written before StartDate was captured: no monthly series (yearly charts)
+        pass
+    # Stored compact (dictionary-encoded categoricals), so readers never convert them
+    return charts.compact_frames(frames)
+
+
+# CANCELLATION DELTAS (process_cancellations.py --delta)
+#
+# delta: cancellation rows with a Sign column, -1 for the stored rows of a changed or removed grant
+# and +1 for the new rows of an added or changed grant. Counts are updated by adding the signed rows,
+# so a refresh reads the changed grants only.
+
+CANCELLATION_STATUSES = ['Terminated', 'Reinstated']
+
+def update_q5_frame(cancelled_by_state_year, delta, mappings):
+    keys = ['Year', 'StateCode', 'StateName', 'Status']
+    delta = delta.assign(StateName=delta['StateCode'].map(mappings['state_name']))
+    counts = pd.concat([
+        cancelled_by_state_year[keys + ['Count']].astype({col: 'object' for col in keys[1:]}),
+        delta[keys + ['Sign']].rename(columns={'Sign': 'Count'})
+    ], ignore_index=True)
+    counts = counts.groupby(keys)['Count'].sum().reset_index()
+    counts = counts[counts['Count'] > 0].reset_index(drop=True)
+    return charts.add_q5_columns(counts, mappings)
+
+def get_status_deltas(delta, keys):
+    # Signed Terminated / Reinstated counts per keys
+    counts = delta.pivot_table(index=keys, columns='Status', values='Sign', aggfunc='sum', fill_value=0)
+    return counts.reindex(columns=CANCELLATION_STATUSES, fill_value=0).rename_axis(columns=None).reset_index()
+
+def update_q2_frame(df, delta, keys, num_years):
+    # df: df_scatter (keys: directorate) or df_div (keys: directorate, division), yearly rows and
+    # all-years rows (YEAR_ALL_INDICATOR, TotalGrants as a yearly average)
+    counts = pd.concat([
+        get_status_deltas(delta, keys).assign(Year=YEAR_ALL_INDICATOR),
+        get_status_deltas(delta, keys + ['Year'])
+    ], ignore_index=True)
+    df = df.astype({col: 'object' for col in keys}).merge(counts, on=keys + ['Year'], how='left', suffixes=('', '_delta'))
+    for status in CANCELLATION_STATUSES:
+        df[status] = df[status] + df.pop(f'{status}_delta').fillna(0)
+    return charts.add_cancel_rates(df, np.where(df['Year'] == YEAR_ALL_INDICATOR, num_years, 1))
+
+def update_budget_sketches(budget_sketches, delta, df_awards, mappings):
+    # A grant is Cancelled while it has any cancellation row: only grants that gained their first
+    # row or lost their last one move between Active and Cancelled (Terminated <-> Reinstated do not)
+    signs = delta.groupby('AwardID')['Sign']
+    had_rows = signs.min() < 0
+    has_rows = signs.max() > 0
+    cancelled = df_awards[df_awards['AwardID'].isin(had_rows.index[has_rows & ~had_rows])]
+    uncancelled = df_awards[df_awards['AwardID'].isin(had_rows.index[had_rows & ~has_rows])]
+
+    removed = pd.concat([
+        cancelled.assign(Status=sketches.STATUS_ACTIVE), uncancelled.assign(Status=sketches.STATUS_CANCELLED)
+    ], ignore_index=True)
+    added = pd.concat([
+        cancelled.assign(Status=sketches.STATUS_CANCELLED), uncancelled.assign(Status=sketches.STATUS_ACTIVE)
+    ], ignore_index=True)
+    return sketches.update_sketches(budget_sketches, removed, added, mappings)
+
+def apply_cancellation_delta(frames, delta, years):
+    # Returns the updated frames, or None when the change reaches beyond the cancellation aggregates:
+    # cancelled grants missing from the awards also count as grants (Q1, Q4, Q5.1), so those need a rebuild
+    mappings = charts.get_mappings()
+    delta = delta[delta['Year'].isin(years)]
+    columns = list(dict.fromkeys(sketches.AWARD_COLUMNS + institutions.AWARD_COLUMNS))
+    df_awards = data_store.lookup_awards(delta['AwardID'], columns=columns, years=years)
+    if (~delta['AwardID'].isin(df_awards['AwardID']) & delta['StateCode'].notna()).any():
+        return None
+
+    frames = dict(frames)
+    frames['cancelled_by_state_year'] = update_q5_frame(frames['cancelled_by_state_year'], delta, mappings)
+    frames['df_scatter'] = update_q2_frame(frames['df_scatter'], delta, ['DirectorateAbbr'], len(years))
+    frames['df_div'] = update_q2_frame(frames['df_div'], delta, ['DirectorateAbbr', 'DivisionAbbr'], len(years))
+    frames['budget_sketches'] = update_budget_sketches(frames['budget_sketches'], delta, df_awards, mappings)
+    frames['budget_quantiles'] = sketches.get_budget_quantiles(frames['budget_sketches'])
+    frames['institution_stats'] = institutions.update_institution_stats(frames['institution_stats'], delta, df_awards)
+    return charts.compact_frames(frames)
+
+def refresh_frames(delta, years=None):
+    # Applies a cancellation delta to the LATEST bundle (full build when there is none or it does not apply)
+    if years is None:
+        years = data_store.get_dashboard_years()
+    frames = artifacts.load_bundle(years, names=artifacts.BUNDLE_FRAMES + artifacts.CLEAN_FRAMES)
+    if frames is not None and delta[delta['Year'].isin(years)].empty:
+        print("No cancellation changes in the dashboard years: bundle unchanged")
+        return artifacts.get_latest_version()
+
+    updated = None if frames is None else apply_cancellation_delta(frames, delta, years)
+    if updated is None:
+        print("Cancellation delta does not apply to the bundle: rebuilding every frame")
+        updated = build_frames(years)
+    return write_frames(updated, years)
+
+
+def write_frames(frames, years):
+    version = artifacts.write_bundle(frames, years)
+
+    for name in [name for name in artifacts.BUNDLE_FRAMES + artifacts.CLEAN_FRAMES if name in frames]:
+        print(f"{name}: {len(frames[name])} rows")
+    print(f"Saved bundle {version} to: {os.path.join(artifacts.get_bundle_root(), version)}")
+    return version
+
+
+def main():
+    os.chdir(PROJECT_DIR)  # charts reads clean_data/ relative to the project root
+
+    years = data_store.get_dashboard_years()
+    write_frames(build_frames(years), years)
+
+
+if __name__ == '__main__':
+    main()
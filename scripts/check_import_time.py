@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+STREAMLIT_DIR = os.path.join(PROJECT_DIR, "streamlit")
+
+# Import-time guard: each dashboard module is imported in a fresh interpreter with
+# `python -X importtime`. The check fails when a module pulls in a package it must only import
+# lazily, or when the modules of the app's cold path (cached spec) exceed the time budget. The cold
+# path is timed as the fastest of several runs: scheduling and disk noise only ever add time.
+#
+#   python scripts/check_import_time.py [--budget SECONDS] [--runs N]
+
+# Packages each module must not import at load time
+LAZY_IMPORTS = {
+    'data_store': ['numpy', 'pandas', 'pyarrow'],
+    'artifacts': ['numpy', 'pandas', 'pyarrow'],
+    'spec_cache': ['numpy', 'pandas', 'pyarrow', 'altair'],
+    'chart_config': ['numpy', 'pandas', 'pyarrow', 'altair'],
+    'charts': ['altair', 'vega_datasets']
+}
+COLD_PATH = ['data_store', 'artifacts', 'spec_cache', 'chart_config']  # imported by streamlit_app.py before the spec cache lookup
+COLD_PATH_BUDGET = 0.1  # Seconds, on top of streamlit itself
+COLD_PATH_RUNS = 5
+
+
+def measure_import(modules):
+    # Returns (seconds, top-level packages imported) for `import <modules>` in a fresh interpreter
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        cwd=STREAMLIT_DIR, capture_output=True, text=True, check=True
+    )
+    seconds = 0.0
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # Imported at the top level of the command
+            seconds += int(cumulative) / 1e6
+        packages.add(name.strip().split('.')[0])
+    return seconds, packages
+
+def check_imports(budget=COLD_PATH_BUDGET, runs=COLD_PATH_RUNS):
+    report = []
+    for module, lazy in LAZY_IMPORTS.items():
+        seconds, packages = measure_import([module])
+        eager = sorted(set(lazy) & packages)
+        report.append({'Module': module, 'Seconds': round(seconds, 3), 'Eager Imports': ', '.join(eager), 'OK': not eager})
+
+    seconds = min(measure_import(COLD_PATH)[0] for _ in range(runs))
+    report.append({
+        'Module': f"cold path ({', '.join(COLD_PATH)})",
+        'Seconds': round(seconds, 3),
+        'Eager Imports': '',
+        'OK': seconds <= budget
+    })
+    return pd.DataFrame(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when dashboard modules import heavy packages eagerly or get slower to import.")
+    parser.add_argument('--budget', type=float, default=COLD_PATH_BUDGET, help="import time budget of the cold path, in seconds")
+    parser.add_argument('--runs', type=int, default=COLD_PATH_RUNS, help="cold path imports timed, the fastest one is kept")
+    args = parser.parse_args()
+
+    report = check_imports(args.budget, args.runs)
+    print(report.to_string(index=False))
+    if not report['OK'].all():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
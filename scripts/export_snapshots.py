@@ -0,0 +1,174 @@
+import argparse
+import concurrent.futures
+import copy
+import hashlib
+import json
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit"))
+import altair as alt
+import artifacts
+import charts
+import data_store
+from chart_config import CHART_CONFIG
+import build_dashboard_artifacts
+
+# Static snapshots of the dashboard for every fiscal year x party filter:
+#   snapshots/<year>_<party>.{png,svg,html} + snapshots/manifest.json
+# The spec is built once; each snapshot only sets the year_select / party_filter values.
+# Snapshots are rendered headlessly with vl-convert in a process pool, and a snapshot whose
+# spec hash matches the manifest (and whose files exist) is skipped.
+#
+#   python scripts/export_snapshots.py [--formats png svg html] [--workers N] [--force]
+
+OUTPUT_DIR = "snapshots"
+MANIFEST_FILE = "manifest.json"
+FORMATS = ['png', 'svg', 'html']
+PNG_SCALE = 2
+
+VL_VERSION = "_".join(alt.SCHEMA_VERSION.split(".")[:2])  # vl-convert version string, as Altair uses
+
+
+# SPEC
+
+def load_frames(years):
+    # Prebuilt bundle when available, otherwise the frames are computed (cube backend)
+    frames = artifacts.load_bundle(years)
+    if frames is None:
+        frames = build_dashboard_artifacts.build_frames(years)
+    return frames
+
+def build_spec(frames):
+    visualization = charts.get_visualization(
+        frames.get('df_complete'), frames['df_state_grants'], frames['df_scatter'], frames['df_div'],
+        frames['q1_combined'], frames['cancelled_by_state_year'], CHART_CONFIG,
+        frames.get('combined_q4'), frames.get('combined_q5_with_states'), frames.get('q5_segments'),
+        frames.get('budget_quantiles'), frames.get('monthly_series')
+    )
+    return visualization.to_dict()
+
+def set_param_values(spec, values):
+    spec = copy.deepcopy(spec)
+    for param in spec.get('params', []):
+        if param['name'] in values:
+            param['value'] = values[param['name']]
+    return spec
+
+def get_spec_hash(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_snapshot_name(year, party):
+    year_label = 'all' if year == CHART_CONFIG['YEAR_ALL_INDICATOR'] else str(year)
+    return f"{year_label}_{party.lower()}"
+
+
+# RENDER (worker processes)
+
+_base_spec = None
+
+def init_worker(spec):
+    global _base_spec
+    _base_spec = spec
+
+def render_snapshot(name, values, formats, output_dir):
+    import vl_convert as vlc
+
+    start = time.perf_counter()
+    spec = set_param_values(_base_spec, values)
+    files = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        if fmt == 'png':
+            content = vlc.vegalite_to_png(spec, vl_version=VL_VERSION, scale=PNG_SCALE)
+        elif fmt == 'svg':
+            content = vlc.vegalite_to_svg(spec, vl_version=VL_VERSION).encode('utf-8')
+        else:
+            content = vlc.vegalite_to_html(spec, vl_version=VL_VERSION, bundle=True).encode('utf-8')
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+        files.append(os.path.basename(path))
+    return files, time.perf_counter() - start
+
+
+# EXPORT
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def is_unchanged(entry, spec_hash, formats, output_dir):
+    return (
+        entry is not None and entry['spec_hash'] == spec_hash and
+        all(os.path.exists(os.path.join(output_dir, f"{entry['name']}.{fmt}")) for fmt in formats)
+    )
+
+def export_snapshots(formats=FORMATS, output_dir=OUTPUT_DIR, max_workers=None, force=False):
+    years = data_store.get_dashboard_years()
+    spec = build_spec(load_frames(years))
+
+    tasks = {}
+    for year in [CHART_CONFIG['YEAR_ALL_INDICATOR']] + years:
+        for party in charts.PARTY_FILTER_OPTIONS:
+            name = get_snapshot_name(year, party)
+            values = {'year_select': year, 'party_filter': party}
+            tasks[name] = (values, get_spec_hash(set_param_values(spec, values)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    report = []
+    pending = {}
+    for name, (values, spec_hash) in tasks.items():
+        if not force and is_unchanged(manifest.get(name), spec_hash, formats, output_dir):
+            report.append((name, 'skipped', 0.0))
+        else:
+            pending[name] = (values, spec_hash)
+
+    if pending:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker, initargs=(spec,)
+        ) as executor:
+            futures = {
+                executor.submit(render_snapshot, name, values, formats, output_dir): name
+                for name, (values, _) in pending.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                values, spec_hash = pending[name]
+                try:
+                    files, seconds = future.result()
+                except Exception as e:  # Keep exporting the other snapshots
+                    report.append((name, f'failed: {e}', 0.0))
+                    continue
+                manifest[name] = {'name': name, 'spec_hash': spec_hash, 'values': values, 'files': files}
+                report.append((name, 'rendered', round(seconds, 2)))
+
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return sorted(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export PNG/SVG/HTML snapshots of the dashboard for every year and party filter.")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--workers', type=int, default=None, help="number of render processes")
+    parser.add_argument('--force', action='store_true', help="render every snapshot, even if its spec is unchanged")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)  # charts reads clean_data/ relative to the project root
+    report = export_snapshots(args.formats, max_workers=args.workers, force=args.force)
+    for name, status, seconds in report:
+        print(f"{name}: {status}" + (f" ({seconds}s)" if status == 'rendered' else ""))
+    print(f"Snapshots saved to: {os.path.abspath(OUTPUT_DIR)}")
+
+
+if __name__ == '__main__':
+    main()
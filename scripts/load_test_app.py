@@ -0,0 +1,200 @@
+import argparse
+import ast
+import concurrent.futures
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+STREAMLIT_DIR = os.path.join(PROJECT_DIR, "streamlit")
+APP_FILE = os.path.join(STREAMLIT_DIR, "streamlit_app.py")
+
+sys.path.insert(0, STREAMLIT_DIR)
+
+# Concurrent-session load test of the dashboard: N simulated sessions open the app at once
+# (Streamlit's AppTest, headless, in one process so they share st.cache_data / st.cache_resource
+# like the sessions of one server), first with cold caches, then with warm ones. Each session
+# runs the script once, then `--reruns` more times (a widget interaction reruns the whole script).
+# Reports p50/p95/p99 script-run latency, peak RSS of the process during the phase and the
+# protobuf payload bytes sent to each session.
+# The app writes its spec cache and chart data to a scratch directory (emptied before the cold
+# phase), so the runs neither depend on nor alter the caches of the deployed dashboard.
+#
+#   python scripts/load_test_app.py [--sessions 8] [--reruns 1] [--set USE_SPEC_CACHE=False] [--save report.json]
+
+SESSIONS = 8
+RERUNS = 1
+RUN_TIMEOUT = 600  # Seconds per script run (a cold run builds every frame)
+RSS_SAMPLE_INTERVAL = 0.01
+PHASES = ['cold', 'warm']
+
+
+# APP
+
+SETTING_PREFIX = 'NSF_DASHBOARD_'  # streamlit_app.get_setting
+
+def get_app_settings():
+    # Names of the app constants that can be overridden (read with get_setting)
+    with open(APP_FILE, 'r', encoding='utf-8') as f:
+        return set(re.findall(r"get_setting\('(\w+)'", f.read()))
+
+def parse_overrides(items):
+    overrides = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        overrides[name.strip()] = ast.literal_eval(value.strip())
+    return overrides
+
+def set_app_settings(overrides, scratch_dir):
+    # Environment read by the app: the overrides, and the spec cache and chart data in scratch_dir
+    settings = {
+        'SPEC_CACHE_DIR': os.path.join(scratch_dir, 'specs'),
+        'CHART_DATA_DIR': os.path.join(scratch_dir, 'chart_data'),
+        **overrides
+    }
+    known = get_app_settings()
+    for name, value in settings.items():
+        if name not in known:
+            raise ValueError(f"{name} is not a setting of {os.path.basename(APP_FILE)}")
+        os.environ[SETTING_PREFIX + name] = repr(value)
+
+def clear_caches(scratch_dir):
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for name in os.listdir(scratch_dir):
+        shutil.rmtree(os.path.join(scratch_dir, name), ignore_errors=True)
+
+
+# MEASUREMENTS
+
+def get_rss():
+    # Current resident set size in bytes (peak RSS of the process where /proc is not available)
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss: bytes on macOS, KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+class RssMonitor:
+    # Samples the RSS in a background thread: peak over the monitored block
+    def __enter__(self):
+        self.peak = get_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, get_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, get_rss())
+
+def get_payload_bytes(app_test):
+    # Serialized size of the element and block protos rendered for the session
+    total = 0
+    nodes = [app_test.main, app_test.sidebar]
+    while nodes:
+        node = nodes.pop()
+        proto = getattr(node, 'proto', None)
+        if proto is not None and hasattr(proto, 'ByteSize'):
+            total += proto.ByteSize()
+        nodes.extend(getattr(node, 'children', {}).values())
+    return total
+
+
+# SESSIONS
+
+def run_session(reruns, start):
+    from streamlit.testing.v1 import AppTest
+
+    start.wait()  # Every session opens the app at the same time
+    app_test = AppTest.from_file(APP_FILE, default_timeout=RUN_TIMEOUT)
+    times = []
+    for _ in range(1 + reruns):
+        run_start = time.perf_counter()
+        app_test.run()
+        times.append(time.perf_counter() - run_start)
+    errors = [exception.message for exception in app_test.exception]
+    return {'times': times, 'payload': get_payload_bytes(app_test), 'errors': errors}
+
+def run_phase(sessions, reruns):
+    start = threading.Barrier(sessions)
+    with RssMonitor() as rss:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=sessions) as executor:
+            futures = [executor.submit(run_session, reruns, start) for _ in range(sessions)]
+            results = [future.result() for future in futures]
+    return results, rss.peak
+
+def summarize_phase(phase, results, peak_rss):
+    times = 1000 * np.array([t for result in results for t in result['times']])
+    first_runs = 1000 * np.array([result['times'][0] for result in results])
+    return {
+        'Phase': phase,
+        'Sessions': len(results),
+        'Runs': len(times),
+        'P50Ms': round(float(np.percentile(times, 50)), 1),
+        'P95Ms': round(float(np.percentile(times, 95)), 1),
+        'P99Ms': round(float(np.percentile(times, 99)), 1),
+        'MaxFirstRunMs': round(float(first_runs.max()), 1),
+        'PeakRssMB': round(peak_rss / 2**20, 1),
+        'PayloadKB': round(float(np.mean([result['payload'] for result in results])) / 1024, 1),
+        'Errors': sum(len(result['errors']) for result in results)
+    }
+
+def run_load_test(sessions=SESSIONS, reruns=RERUNS, overrides=None):
+    # Returns (report, error messages)
+    scratch_dir = tempfile.mkdtemp(prefix='load_test_')
+    try:
+        set_app_settings(overrides or {}, scratch_dir)
+        report = []
+        errors = set()
+        for phase in PHASES:
+            if phase == 'cold':
+                clear_caches(scratch_dir)
+            results, peak_rss = run_phase(sessions, reruns)
+            report.append(summarize_phase(phase, results, peak_rss))
+            errors.update(error for result in results for error in result['errors'])
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    return pd.DataFrame(report), sorted(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent headless sessions (cold and warm caches).")
+    parser.add_argument('--sessions', type=int, default=SESSIONS, help="concurrent simulated sessions")
+    parser.add_argument('--reruns', type=int, default=RERUNS, help="reruns per session after the first run")
+    parser.add_argument('--set', action='append', metavar='NAME=VALUE',
+                        help="override a constant of streamlit_app.py (Python literal), e.g. QUERY_BACKEND='cube'")
+    parser.add_argument('--save', help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)  # The app reads clean_data/ relative to the project root
+    report, errors = run_load_test(args.sessions, args.reruns, parse_overrides(args.set))
+    print(report.to_string(index=False))
+    for error in errors:
+        print(f"Session error: {error}")
+
+    if args.save:
+        report.to_json(args.save, orient='records', indent=2)
+        print(f"Report saved to: {args.save}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import functools
+import re
+import numpy as np
+import pandas as pd
+
+# Directorate and Division name cleanup shared by the ETL scripts (prefixes removed for
+# cleaner tooltips). Names repeat across thousands of rows, so each distinct value is
+# normalized once and the result is mapped back to the rows through factorized codes.
+
+DIRECTORATE_PATTERNS = (
+    re.compile(r'^Directorate for '),
+)
+DIVISION_PATTERNS = (
+    re.compile(r'^Division [Oo]f '),
+    re.compile(r'^OIA-'),
+    re.compile(r'^Div\. of '),
+    re.compile(r' \([A-Z/&]+\)$'),  # Repeated DivisionAbbr at the end
+)
+
+
+@functools.lru_cache(maxsize=None)
+def normalize_name(name, patterns):
+    for pattern in patterns:
+        name = pattern.sub('', name)
+    return name
+
+def normalize_names(series, patterns):
+    codes, uniques = pd.factorize(series)
+    normalized = np.array([normalize_name(str(name), patterns) for name in uniques] + [np.nan], dtype=object)
+    return pd.Series(normalized[codes], index=series.index, name=series.name)  # code -1 (missing) -> NaN
+
+def normalize_directorates(series):
+    return normalize_names(series, DIRECTORATE_PATTERNS)
+
+def normalize_divisions(series):
+    return normalize_names(series, DIVISION_PATTERNS)
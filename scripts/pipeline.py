@@ -0,0 +1,271 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+STREAMLIT_DIR = os.path.join(PROJECT_DIR, "streamlit")
+
+sys.path.insert(0, STREAMLIT_DIR)
+import data_store
+import process_awards
+import process_cancellations
+import build_dashboard_artifacts
+
+# Whole ETL in one process: awards ingest (one stage per fiscal year) -> award index,
+# cancellation cleanup -> enrichment, then the dashboard bundle. Frames are handed between
+# stages in memory. A stage is skipped when the hash of its code, inputs and upstream stages
+# matches the last run; its result is then loaded from the stage cache only if a downstream
+# stage needs it. Independent stages (the fiscal years, the cancellation cleanup) run concurrently.
+#
+#   python scripts/pipeline.py [--force]
+
+CACHE_DIR = os.path.join("clean_data", ".pipeline")
+
+
+# FINGERPRINTS
+
+def hash_code(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def hash_inputs(paths):
+    # Size and modification time (raw award folders hold thousands of JSON files)
+    digest = hashlib.sha256()
+    for path in paths:
+        files = [path] if not os.path.isdir(path) else sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+        )
+        for file_path in files:
+            if os.path.exists(file_path):
+                stat = os.stat(file_path)
+                digest.update(f'{file_path}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+            else:
+                digest.update(f'{file_path}:missing'.encode('utf-8'))
+    return digest.hexdigest()
+
+def get_fingerprint(stage, upstream):
+    return hashlib.sha256(json.dumps({
+        'code': hash_code(stage['code']),
+        'inputs': hash_inputs(stage['inputs']),
+        'params': stage['params'],
+        'upstream': upstream
+    }, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# STAGE CACHE
+
+def get_cache_paths(name):
+    return os.path.join(CACHE_DIR, f'{name}.pkl'), os.path.join(CACHE_DIR, f'{name}.json')
+
+def is_cached(stage, fingerprint):
+    # Unchanged since the last run, and the outputs that run wrote are still there (stages may leave
+    # out some declared outputs, e.g. a fiscal year without grants writes no partition)
+    result_path, meta_path = get_cache_paths(stage['name'])
+    if not (os.path.exists(result_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    outputs = meta.get('outputs', stage['outputs'])
+    return meta['fingerprint'] == fingerprint and all(os.path.exists(path) for path in outputs)
+
+def save_result(name, fingerprint, result, outputs):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    result_path, meta_path = get_cache_paths(name)
+    with open(f'{result_path}.tmp', 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f'{result_path}.tmp', result_path)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'outputs': outputs}, f)
+
+def load_result(name):
+    with open(get_cache_paths(name)[0], 'rb') as f:
+        return pickle.load(f)
+
+
+# STAGES
+
+def get_stages():
+    fiscal_years = data_store.get_fiscal_years()
+    dashboard_years = data_store.get_dashboard_years()
+    shared_code = [os.path.join(STREAMLIT_DIR, 'data_store.py')]
+    awards_code = shared_code + [process_awards.__file__, os.path.join(SCRIPT_DIR, 'name_normalization.py')]
+    cancellations_code = shared_code + [
+        process_cancellations.__file__,
+        os.path.join(SCRIPT_DIR, 'corrections.py'),
+        os.path.join(SCRIPT_DIR, 'name_normalization.py')
+    ]
+
+    def ingest_awards(year):
+        def run(results):
+            df_year = process_awards.ingest_year(year)
+            if df_year is None:
+                print(f"{year} completed (no grants)")
+                return None
+            path = data_store.write_award_partition(df_year, year, process_awards.OUTPUT_DIR)
+            print(f"{year} completed ({len(df_year)} grants) -> {path}")
+            return df_year
+        return run
+
+    def index_awards(results):
+        partitions = [results[f'awards_{year}'] for year in fiscal_years]
+        partitions = [df_year for df_year in partitions if df_year is not None]
+        if not partitions:
+            return {'awards': None, 'award_index': None}
+        df_awards = pd.concat(partitions, ignore_index=True)
+        award_index = data_store.build_award_index(df_awards)
+        path = data_store.write_award_index(award_index, process_awards.OUTPUT_DIR)
+        print(f"Award index saved to: {path}")
+        return {'awards': df_awards, 'award_index': award_index}
+
+    def clean_cancellations(results):
+        return process_cancellations.clean_cancellations(pd.read_csv(process_cancellations.INPUT_FILE), fiscal_years)
+
+    def enrich_cancellations(results):
+        df_clean = process_cancellations.enrich_cancellations(
+            results['cancellations_clean'], fiscal_years, results['award_index']['award_index']
+        )
+        process_cancellations.write_cancellations(df_clean, results['cancellations_clean'])
+        return df_clean
+
+    def build_aggregates(results):
+        frames = build_dashboard_artifacts.build_frames(
+            dashboard_years, results['award_index']['awards'], results['cancellations']
+        )
+        return build_dashboard_artifacts.write_frames(frames, dashboard_years)
+
+    stages = [
+        {
+            'name': f'awards_{year}',
+            'deps': [],
+            'run': ingest_awards(year),
+            'code': awards_code,
+            'inputs': [os.path.join(process_awards.NSF_DATA_DIR, str(year))],
+            'outputs': [data_store.get_award_partition_path(year, process_awards.OUTPUT_DIR)],  # Not written without grants
+            'params': {'year': year}
+        }
+        for year in fiscal_years
+    ]
+    stages += [
+        {
+            'name': 'award_index',
+            'deps': [f'awards_{year}' for year in fiscal_years],
+            'run': index_awards,
+            'code': shared_code,
+            'inputs': [],
+            'outputs': [data_store.get_award_index_path(process_awards.OUTPUT_DIR)],
+            'params': {'years': fiscal_years}
+        },
+        {
+            'name': 'cancellations_clean',
+            'deps': [],
+            'run': clean_cancellations,
+            'code': cancellations_code,
+            'inputs': [process_cancellations.INPUT_FILE],
+            'outputs': [],
+            'params': {'years': fiscal_years}
+        },
+        {
+            'name': 'cancellations',
+            'deps': ['cancellations_clean', 'award_index'],
+            'run': enrich_cancellations,
+            'code': cancellations_code,
+            'inputs': [process_cancellations.RULES_FILE],
+            'outputs': [process_cancellations.OUTPUT_FILE, process_cancellations.STATE_FILE],
+            'params': {}
+        },
+        {
+            'name': 'aggregates',
+            'deps': ['award_index', 'cancellations'],
+            'run': build_aggregates,
+            'code': [build_dashboard_artifacts.__file__] + [
+                os.path.join(STREAMLIT_DIR, name) for name in ['artifacts.py', 'chart_config.py', 'charts.py', 'cube.py', 'data_store.py', 'institutions.py', 'sketches.py', 'timeseries.py']
+            ],
+            'inputs': [os.path.join('clean_data', 'us_states.csv')],
+            'outputs': [os.path.join(build_dashboard_artifacts.artifacts.get_bundle_root(), 'LATEST')],
+            'params': {'years': dashboard_years}
+        }
+    ]
+    return stages
+
+
+# RUNNER
+
+def run_pipeline(stages, force=False, max_workers=None):
+    by_name = {stage['name']: stage for stage in stages}
+
+    # Stages are listed in dependency order, so upstream fingerprints are always known
+    fingerprints = {}
+    for stage in stages:
+        fingerprints[stage['name']] = get_fingerprint(stage, [fingerprints[dep] for dep in stage['deps']])
+    # Skipped: unchanged since the last run and its published files are still there
+    skipped = {
+        stage['name'] for stage in stages
+        if not force and is_cached(stage, fingerprints[stage['name']])
+    }
+
+    results = {}
+    results_lock = threading.Lock()
+
+    def get_result(name):
+        # Results of skipped stages are loaded from the cache only when a running stage needs them
+        with results_lock:
+            if name not in results:
+                results[name] = load_result(name)
+            return results[name]
+
+    def run_stage(name):
+        start = time.perf_counter()
+        result = by_name[name]['run']({dep: get_result(dep) for dep in by_name[name]['deps']})
+        outputs = [path for path in by_name[name]['outputs'] if os.path.exists(path)]
+        save_result(name, fingerprints[name], result, outputs)
+        with results_lock:
+            results[name] = result
+        return time.perf_counter() - start
+
+    report = []
+    done = set(skipped)
+    pending = [stage['name'] for stage in stages if stage['name'] not in skipped]
+    for name in skipped:
+        report.append({'Stage': name, 'Status': 'skipped', 'Seconds': 0.0})
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            for name in [name for name in pending if all(dep in done for dep in by_name[name]['deps'])]:
+                pending.remove(name)
+                running[executor.submit(run_stage, name)] = name
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                report.append({'Stage': name, 'Status': 'ran', 'Seconds': round(future.result(), 2)})
+                done.add(name)
+
+    order = {stage['name']: i for i, stage in enumerate(stages)}
+    return pd.DataFrame(report).sort_values('Stage', key=lambda names: names.map(order)).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the NSF ETL pipeline, skipping unchanged stages.")
+    parser.add_argument('--force', action='store_true', help="run every stage, ignoring the stage cache")
+    parser.add_argument('--workers', type=int, default=None, help="maximum number of concurrent stages")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)  # scripts and charts use paths relative to the project root
+    report = run_pipeline(get_stages(), force=args.force, max_workers=args.workers)
+    print(report.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
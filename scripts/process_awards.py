@@ -3,10 +3,14 @@ import json
 import os
 import glob
 import concurrent.futures
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit"))
+import data_store
+import name_normalization
 
 NSF_DATA_DIR = os.path.join("raw_data", "full_nsf_awards_data")
 OUTPUT_DIR = "clean_data"
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "nsf_awards_full.csv")
 
 EXCLUDED_LOCATIONS = {'AS', 'GU', 'MP', 'PR', 'VI', 'BM-07', 'GENEVA'}
 
@@ -37,7 +41,10 @@ def process_file(file_path):
         'DivisionAbbr': d.get('div_abbr'),
         'StateCode': state_code,
         'StateName': inst.get('inst_state_name'),
+        'InstitutionID': inst.get('org_uei_num') or None,  # Unique Entity ID (SAM.gov)
+        'Institution': inst.get('inst_name'),
         'Year': fiscal_year,
+        'StartDate': d.get('awd_eff_date'),  # Award effective date (monthly series)
         'EstimatedBudget': max(
             float(d.get('tot_intn_awd_amt', 0) or 0),
             float(d.get('awd_amount', 0) or 0)
@@ -46,52 +53,66 @@ def process_file(file_path):
     return item
 
 
-def main():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    years = ['2021', '2022', '2023', '2024', '2025']
-    first_year = True
-    
-    for year in years:
-        search_path = os.path.join(NSF_DATA_DIR, year, "*.json")
-        files = glob.glob(search_path)
-        
-        year_grants = []
-        
-        # parallel processing
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            results = executor.map(process_file, files)
-            
-            for res in results:
-                if res is not None:
-                    year_grants.append(res)
-        
-        df_year = pd.DataFrame(year_grants)
-        
-        if not df_year.empty:
-            if first_year:
-                df_year.to_csv(OUTPUT_FILE, index=False, mode='w')
-                first_year = False
-            else:
-                df_year.to_csv(OUTPUT_FILE, index=False, mode='a', header=False)
-        
-        print(f"{year} completed")
-    
-    df_final = pd.read_csv(OUTPUT_FILE)
-    
+def clean_awards(df):
     # exclude administrative/governance units (< 100 grants, not research directorates)
     EXCLUDED_DIRECTORATES = {'IRM', 'BFA', 'NSB', 'OCIO'}
-    df_final = df_final[~df_final['DirectorateAbbr'].isin(EXCLUDED_DIRECTORATES)]
+    df = df[~df['DirectorateAbbr'].isin(EXCLUDED_DIRECTORATES)].copy()
+    df = data_store.parse_award_ids(df, 'Awards')
+    df['StartDate'] = pd.to_datetime(df['StartDate'], errors='coerce', format='mixed').dt.strftime('%Y-%m-%d')
     
     # clean Directorate and Division names (remove prefixes for cleaner tooltips)
-    df_final['Directorate'] = df_final['Directorate'].str.replace(r'^Directorate for ', '', regex=True)
-    df_final['Division'] = df_final['Division'].str.replace(r'^Division [Oo]f ', '', regex=True)
-    df_final['Division'] = df_final['Division'].str.replace(r'^OIA-', '', regex=True)
-    df_final['Division'] = df_final['Division'].str.replace(r'^Div\. of ', '', regex=True)
-    df_final['Division'] = df_final['Division'].str.replace(r' \([A-Z/&]+\)$', '', regex=True) # Repeated DivisionAbbr at the end
+    df['Directorate'] = name_normalization.normalize_directorates(df['Directorate'])
+    df['Division'] = name_normalization.normalize_divisions(df['Division'])
+    return df
+
+
+def ingest_year(year):
+    search_path = os.path.join(NSF_DATA_DIR, str(year), "*.json")
+    files = glob.glob(search_path)
+    
+    year_grants = []
+    
+    # parallel processing
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        results = executor.map(process_file, files)
+        
+        for res in results:
+            if res is not None:
+                year_grants.append(res)
     
-    df_final.to_csv(OUTPUT_FILE, index=False)
-    print(f"Saved to: {OUTPUT_FILE}")
+    df_year = pd.DataFrame(year_grants)
+    if df_year.empty:
+        return None
+    return clean_awards(df_year)
+
+
+def write_awards(partitions):
+    # one CSV partition per fiscal year, plus the AwardID-sorted index of all of them
+    # (per-award lookups, e.g. cancellation enrichment)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for year, df_year in partitions.items():
+        path = data_store.write_award_partition(df_year, year, OUTPUT_DIR)
+        print(f"{year} completed ({len(df_year)} grants) -> {path}")
+
+    award_index = None
+    if partitions:
+        award_index = data_store.build_award_index(pd.concat(partitions.values(), ignore_index=True))
+        path = data_store.write_award_index(award_index, OUTPUT_DIR)
+        print(f"Award index saved to: {path}")
+    return award_index
+
+
+def main():
+    # one partition per fiscal year (range configured in config.json)
+    partitions = {}
+    for year in data_store.get_fiscal_years():
+        df_year = ingest_year(year)
+        if df_year is not None:
+            partitions[year] = df_year
+        else:
+            print(f"{year} completed (no grants)")
+
+    write_awards(partitions)
 
 
 if __name__ == '__main__':
@@ -1,16 +1,26 @@
+import argparse
+import hashlib
+import json
 import pandas as pd
 import os
+import sys
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
 
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit"))
+import data_store
+import build_dashboard_artifacts
+import corrections
+import name_normalization
+
 INPUT_FILE = os.path.join(PROJECT_DIR, "raw_data", "original_data", "nsf_terminations_airtable.csv")
 OUTPUT_DIR = os.path.join(PROJECT_DIR, "clean_data")
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "nsf_cancellations.csv")
+RULES_FILE = os.path.join(SCRIPT_DIR, "cancellation_corrections.json")
+STATE_FILE = os.path.join(OUTPUT_DIR, "nsf_cancellations_state.json")  # Per-grant hashes of the last processed export
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-df = pd.read_csv(INPUT_FILE)
+EXCLUDED_LOCATIONS = {'AS', 'GU', 'MP', 'PR', 'VI'}
 
 # needed columns
 columns_mapping = {
@@ -24,90 +34,183 @@ columns_mapping = {
     'dir': 'DirectorateAbbr'
 }
 
-df_clean = df[list(columns_mapping.keys())].copy()
-df_clean = df_clean.rename(columns=columns_mapping)
-
-df_clean['AwardID'] = df_clean['AwardID'].astype(str)
-df_clean['Status'] = df_clean['Status'].str.replace('❌ ', '', regex=False)
-df_clean['Status'] = df_clean['Status'].str.replace('🔄 Possibly ', '', regex=False)
-
-# normalize Directorate names (match nsf_awards_full.csv)
-df_clean['Directorate'] = df_clean['Directorate'].replace({
-    'Office of the Director': 'Office Of The Director',
-    'Technology, Innovation and Partnerships': 'Directorate for Technology, Innovation, and Partnerships'
-})
 
-# fiscal year (Oct 1 - Sep 30): if month >= 10, FY = year + 1
-start_date = pd.to_datetime(df_clean['Year'], errors='coerce')
-df_clean['Year'] = start_date.dt.year + (start_date.dt.month >= 10).astype(int)
-
-df_clean = df_clean[df_clean['Year'].between(2021, 2025)]
-
-EXCLUDED_LOCATIONS = {'AS', 'GU', 'MP', 'PR', 'VI'}
-df_clean = df_clean[~df_clean['StateCode'].isin(EXCLUDED_LOCATIONS)]
-
-# normalize abbreviations (match nsf_awards_full.csv)
-df_clean['DirectorateAbbr'] = df_clean['DirectorateAbbr'].replace({
-    'CISE': 'CSE',
-    'OD': 'O/D'
-})
-
-# add Division (nsf_awards_full.csv as source)
-FULL_AWARDS_FILE = os.path.join(OUTPUT_DIR, "nsf_awards_full.csv")
-df_full = pd.read_csv(FULL_AWARDS_FILE, usecols=['AwardID', 'Directorate', 'DirectorateAbbr', 'Division', 'DivisionAbbr', 'EstimatedBudget'])
-df_full['AwardID'] = df_full['AwardID'].astype(str)
-
-df_clean = df_clean.merge(
-    df_full[['AwardID', 'Division', 'DivisionAbbr', 'DirectorateAbbr', 'EstimatedBudget']],
-    on='AwardID',
-    how='left',
-    suffixes=('', '_full')
-)
-
-df_clean['DirectorateAbbr'] = df_clean['DirectorateAbbr'].fillna(df_clean['DirectorateAbbr_full'])
-df_clean = df_clean.drop(columns=['DirectorateAbbr_full'])
-
-# align EstimatedBudget (match nsf_awards_full.csv)
-budget_mismatch_before = (df_clean['EstimatedBudget'] != df_clean['EstimatedBudget_full']).sum()
-df_clean.loc[df_clean['EstimatedBudget_full'].notna(), 'EstimatedBudget'] = df_clean['EstimatedBudget_full']
-df_clean = df_clean.drop(columns=['EstimatedBudget_full'])
-
-# fill Directorate with mapping (nsf_awards_full.csv as source)
-directorate_mapping = df_full.groupby('DirectorateAbbr')['Directorate'].first().to_dict()
-for abbr, full_name in directorate_mapping.items():
-    mask = (df_clean['DirectorateAbbr'] == abbr) & (df_clean['Directorate'].isna())
-    df_clean.loc[mask, 'Directorate'] = full_name
-
-# fix for ADVANCE
-advance_mask = (
-    df_clean['ProjectTitle'].str.contains('ADVANCE', case=False, na=False) & 
-    (df_clean['DirectorateAbbr'].isna() | df_clean['Division'].isna())
-)
-df_clean.loc[advance_mask, 'DirectorateAbbr'] = df_clean.loc[advance_mask, 'DirectorateAbbr'].fillna('EDU')
-df_clean.loc[advance_mask, 'Directorate'] = df_clean.loc[advance_mask, 'Directorate'].fillna('Directorate for STEM Education')
-df_clean.loc[advance_mask, 'Division'] = df_clean.loc[advance_mask, 'Division'].fillna('Div. of Equity for Excellence in STEM')
-df_clean.loc[advance_mask, 'DivisionAbbr'] = df_clean.loc[advance_mask, 'DivisionAbbr'].fillna('EES')
-
-# manual fixes for specific AwardIDs (from NSF website)
-manual_fixes = {
-    '1943467': {'Division': 'Division of Information & Intelligent Systems', 'DivisionAbbr': 'IIS'},
-    '2007891': {'Directorate': 'Directorate for Computer and Information Science and Engineering', 'DirectorateAbbr': 'CSE', 'Division': 'Division of Computing and Communication Foundations', 'DivisionAbbr': 'CCF'},
-    '2008428': {'Directorate': 'Directorate for STEM Education', 'DirectorateAbbr': 'EDU', 'Division': 'Div. of Equity for Excellence in STEM', 'DivisionAbbr': 'EES'},
-    '2020709': {'Division': 'Div. of Equity for Excellence in STEM', 'DivisionAbbr': 'EES'}
-}
-for award_id, fixes in manual_fixes.items():
-    mask = df_clean['AwardID'] == award_id
-    for col, val in fixes.items():
-        df_clean.loc[mask, col] = val
-
-df_clean = df_clean.drop(columns=['ProjectTitle'])
-
-# clean Directorate and Division names (remove prefixes for cleaner tooltips)
-df_clean['Directorate'] = df_clean['Directorate'].str.replace(r'^Directorate for ', '', regex=True)
-df_clean['Division'] = df_clean['Division'].str.replace(r'^Division [Oo]f ', '', regex=True)
-df_clean['Division'] = df_clean['Division'].str.replace(r'^Div\. of ', '', regex=True)
-df_clean['Division'] = df_clean['Division'].str.replace(r'^OIA-', '', regex=True)
-df_clean['Division'] = df_clean['Division'].str.replace(r' \([A-Z/&]+\)$', '', regex=True) # Repeated DivisionAbbr at the end remove
-
-df_clean.to_csv(OUTPUT_FILE, index=False)
-print(f"Saved to: {OUTPUT_FILE}")
+def clean_cancellations(df, fiscal_years):
+    # raw terminations -> cancellations in the awards format (no award data needed)
+    df_clean = df[list(columns_mapping.keys())].copy()
+    df_clean = df_clean.rename(columns=columns_mapping)
+
+    df_clean = data_store.parse_award_ids(df_clean, 'Cancellations')
+    df_clean['Status'] = df_clean['Status'].str.replace('❌ ', '', regex=False)
+    df_clean['Status'] = df_clean['Status'].str.replace('🔄 Possibly ', '', regex=False)
+
+    # normalize Directorate names (match nsf_awards_full.csv)
+    df_clean['Directorate'] = df_clean['Directorate'].replace({
+        'Office of the Director': 'Office Of The Director',
+        'Technology, Innovation and Partnerships': 'Directorate for Technology, Innovation, and Partnerships'
+    })
+
+    # fiscal year (Oct 1 - Sep 30): if month >= 10, FY = year + 1
+    start_date = pd.to_datetime(df_clean['Year'], errors='coerce')
+    df_clean['Year'] = start_date.dt.year + (start_date.dt.month >= 10).astype(int)
+    df_clean.insert(df_clean.columns.get_loc('Year') + 1, 'StartDate', start_date.dt.strftime('%Y-%m-%d'))
+
+    df_clean = df_clean[df_clean['Year'].between(fiscal_years[0], fiscal_years[-1])]
+
+    df_clean = df_clean[~df_clean['StateCode'].isin(EXCLUDED_LOCATIONS)]
+
+    # normalize abbreviations (match nsf_awards_full.csv)
+    df_clean['DirectorateAbbr'] = df_clean['DirectorateAbbr'].replace({
+        'CISE': 'CSE',
+        'OD': 'O/D'
+    })
+    return df_clean
+
+
+def enrich_cancellations(df_clean, fiscal_years, award_index=None):
+    # award_index: in-memory index from the awards stage (otherwise the index file is read)
+
+    # add Division (award index as source: only the cancelled AwardIDs are looked up)
+    df_full = data_store.lookup_awards(
+        df_clean['AwardID'],
+        columns=['Division', 'DivisionAbbr', 'DirectorateAbbr', 'EstimatedBudget'],
+        years=fiscal_years,
+        data_dir=OUTPUT_DIR,
+        table=award_index
+    )
+
+    df_clean = df_clean.merge(
+        df_full[['AwardID', 'Division', 'DivisionAbbr', 'DirectorateAbbr', 'EstimatedBudget']],
+        on='AwardID',
+        how='left',
+        suffixes=('', '_full')
+    )
+
+    df_clean['DirectorateAbbr'] = df_clean['DirectorateAbbr'].fillna(df_clean['DirectorateAbbr_full'])
+    df_clean = df_clean.drop(columns=['DirectorateAbbr_full'])
+
+    # align EstimatedBudget (match nsf_awards_full.csv)
+    budget_mismatch_before = (df_clean['EstimatedBudget'] != df_clean['EstimatedBudget_full']).sum()
+    df_clean.loc[df_clean['EstimatedBudget_full'].notna(), 'EstimatedBudget'] = df_clean['EstimatedBudget_full']
+    df_clean = df_clean.drop(columns=['EstimatedBudget_full'])
+
+    # corrections (rules in cancellation_corrections.json): Directorate names from the awards,
+    # ADVANCE fix and manual fixes for specific AwardIDs (from NSF website)
+    rules = corrections.load_rules(RULES_FILE)
+    df_clean, rule_hits = corrections.apply_rules(
+        df_clean, rules,
+        mappings={'directorate_names': data_store.get_directorate_names(fiscal_years, OUTPUT_DIR, award_index)}
+    )
+    print(rule_hits.to_string(index=False))
+
+    df_clean = df_clean.drop(columns=['ProjectTitle'])
+
+    # clean Directorate and Division names (remove prefixes for cleaner tooltips, same rules as process_awards.py)
+    df_clean['Directorate'] = name_normalization.normalize_directorates(df_clean['Directorate'])
+    df_clean['Division'] = name_normalization.normalize_divisions(df_clean['Division'])
+    return df_clean
+
+
+def write_cancellations(df_clean, df_export=None):
+    # df_export: the cleaned (not enriched) export, recorded as the baseline of the next --delta run
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    df_clean.to_csv(OUTPUT_FILE, index=False)
+    print(f"Saved to: {OUTPUT_FILE}")
+    if df_export is not None:
+        write_state(df_export, data_store.get_fiscal_years())
+
+
+# DELTA MODE
+#
+# The terminations export is diffed by grant_id against the previous one: each grant is hashed over its
+# cleaned rows, and only added or changed grants are enriched (award lookups, corrections). Their signed
+# rows are then applied to the dashboard bundle (build_dashboard_artifacts.refresh_frames).
+# Enrichment also depends on the rules, the code (data_store.py included: award lookups) and the award
+# index, so the baseline is only reused while those are unchanged.
+
+def get_state_key(fiscal_years):
+    digest = hashlib.sha256(json.dumps(fiscal_years).encode('utf-8'))
+    for path in [RULES_FILE, __file__, corrections.__file__, name_normalization.__file__, data_store.__file__]:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    index_path = data_store.get_award_index_path(OUTPUT_DIR)
+    if os.path.exists(index_path):
+        stat = os.stat(index_path)
+        digest.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+    return digest.hexdigest()
+
+def get_grant_hashes(df_export):
+    # {AwardID: hash of the grant's cleaned rows} (a grant_id can appear on several rows)
+    # Numeric columns as float64: a single blank budget turns the export's integer column into floats
+    numeric = df_export.select_dtypes('number').columns
+    row_hashes = pd.util.hash_pandas_object(df_export.astype({col: 'float64' for col in numeric}), index=False)
+    grant_hashes = row_hashes.groupby(df_export['AwardID'].values).sum()  # uint64, wraps around
+    return {str(award_id): f'{value:016x}' for award_id, value in grant_hashes.items()}
+
+def read_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_state(df_export, fiscal_years):
+    state = {'key': get_state_key(fiscal_years), 'grants': get_grant_hashes(df_export)}
+    tmp_path = f'{STATE_FILE}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+def get_changed_grants(df_export, state):
+    # Returns (added or changed AwardIDs, removed AwardIDs)
+    grant_hashes = get_grant_hashes(df_export)
+    changed = [int(award_id) for award_id, value in grant_hashes.items() if state['grants'].get(award_id) != value]
+    removed = [int(award_id) for award_id in state['grants'] if award_id not in grant_hashes]
+    return changed, removed
+
+def refresh_cancellations(df_export, fiscal_years):
+    # Returns the signed delta rows, or None when the previous export cannot be used (full run done)
+    state = read_state()
+    if state is None or state['key'] != get_state_key(fiscal_years) or not os.path.exists(OUTPUT_FILE):
+        print("No usable baseline from a previous run: processing the whole export")
+        write_cancellations(enrich_cancellations(df_export, fiscal_years), df_export)
+        return None
+
+    changed, removed = get_changed_grants(df_export, state)
+    print(f"Grants: {len(changed)} added or changed, {len(removed)} removed (of {df_export['AwardID'].nunique()})")
+    df_stored = data_store.read_cancellations(data_dir=OUTPUT_DIR)
+    stale = df_stored['AwardID'].isin(changed + removed)
+    df_enriched = enrich_cancellations(df_export[df_export['AwardID'].isin(changed)], fiscal_years) if changed else None
+
+    # Stored rows of the unchanged grants + enriched rows of the changed ones, in export order
+    df_clean = pd.concat([df_stored[~stale], df_enriched], ignore_index=True)
+    position = pd.Series(range(len(df_export)), index=df_export['AwardID'].values)
+    position = position[~position.index.duplicated()]
+    df_clean = df_clean.iloc[df_clean['AwardID'].map(position).argsort(kind='stable')].reset_index(drop=True)
+    write_cancellations(df_clean, df_export)
+
+    return pd.concat([df_stored[stale].assign(Sign=-1), None if df_enriched is None else df_enriched.assign(Sign=1)], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean and enrich the NSF terminations export.")
+    parser.add_argument('--delta', action='store_true',
+                        help="only process the grants that changed since the previous export, and update the dashboard bundle")
+    args = parser.parse_args()
+
+    fiscal_years = data_store.get_fiscal_years()
+    df_export = clean_cancellations(pd.read_csv(INPUT_FILE), fiscal_years)
+    if not args.delta:
+        write_cancellations(enrich_cancellations(df_export, fiscal_years), df_export)
+        return
+
+    delta = refresh_cancellations(df_export, fiscal_years)
+    os.chdir(PROJECT_DIR)  # The bundle and mappings are read relative to the project root
+    if delta is None:
+        years = data_store.get_dashboard_years()
+        build_dashboard_artifacts.write_frames(build_dashboard_artifacts.build_frames(years), years)
+    else:
+        build_dashboard_artifacts.refresh_frames(delta)
+
+
+if __name__ == '__main__':
+    main()
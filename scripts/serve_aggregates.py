@@ -0,0 +1,253 @@
+import argparse
+import functools
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import os
+import sys
+import threading
+import urllib.parse
+
+import numpy as np
+import pyarrow as pa
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit"))
+import artifacts
+import data_store
+import build_dashboard_artifacts
+
+# Local read-only HTTP API over the dashboard aggregates, for other dashboards:
+#   GET /                                   -> data version and datasets (columns, filters)
+#   GET /<dataset>?year=2024&party=Democrat&directorate=CSE,ENG&state=CA&format=json|arrow
+#
+# The frames come from the artifact bundle (computed like the ETL when there is none). Every
+# filter column gets an in-memory index (value -> row positions), so a query intersects a few
+# position arrays instead of scanning the frame. Responses carry a strong ETag derived from the
+# data version and the normalized query, answer If-None-Match with 304 and are gzip-compressed
+# when the client accepts it. A new bundle (LATEST) is picked up on the next request.
+#
+#   python scripts/serve_aggregates.py [--host 127.0.0.1] [--port 8502]
+
+HOST = "127.0.0.1"
+PORT = 8502
+
+DATASETS = {
+    # name: (frame, source function)
+    'state_grants': ('q1_combined', 'charts.get_q1_data'),
+    'cancellations': ('cancelled_by_state_year', 'charts.get_q5_cancellation_data'),
+    'directorates': ('df_scatter', 'charts.get_q2_data'),
+    'divisions': ('df_div', 'charts.get_q2_data'),
+    'award_sizes': ('budget_quantiles', 'sketches.get_budget_quantiles'),
+    'institutions': ('institution_stats', 'institutions.build_institution_stats'),
+    'monthly': ('monthly_series', 'timeseries.build_monthly_series')
+}
+FILTERS = {'year': 'Year', 'party': 'Party', 'directorate': 'DirectorateAbbr', 'state': 'StateCode'}  # Query parameter: column
+FORMATS = {'json': 'application/json', 'arrow': 'application/vnd.apache.arrow.stream'}
+MIN_GZIP_BYTES = 1024  # Smaller bodies are sent uncompressed
+RESPONSE_CACHE_SIZE = 256
+
+
+# DATA
+
+def load_frames(years, version):
+    # version: the published bundle (LATEST), None when there is none. Returns (data version, frames):
+    # the bundle version, or a digest of the computed frames when the bundle is missing or rejected.
+    # Optional frames the data cannot produce (artifacts.OPTIONAL_FRAMES) are not served.
+    names = [frame for frame, _ in DATASETS.values()]
+    frames = artifacts.load_bundle(years, version=version, names=names) if version else None
+    if frames is None:
+        frames = build_dashboard_artifacts.build_frames(years)
+        digest = hashlib.sha256(''.join(artifacts.get_frame_digest(frames[name]) for name in names if name in frames).encode('utf-8'))
+        version = f'computed-{digest.hexdigest()[:12]}'
+    return version, {name: frames[frame] for name, (frame, _) in DATASETS.items() if frame in frames}
+
+def build_indexes(df):
+    # {query parameter: {value as text: sorted row positions}} for the filter columns of the frame
+    return {
+        param: {str(value): rows for value, rows in df.groupby(column, observed=True, sort=False).indices.items()}
+        for param, column in FILTERS.items() if column in df.columns
+    }
+
+def load_store(years):
+    latest = artifacts.get_latest_version()
+    version, frames = load_frames(years, latest)
+    store = {
+        'version': version,
+        'latest': latest,  # LATEST when loaded (version differs when the bundle was rejected: frames computed)
+        'years': list(years),
+        'frames': frames,
+        'indexes': {name: build_indexes(df) for name, df in frames.items()}
+    }
+    # Encoded responses of this data version, by (dataset, filters, format, gzip)
+    store['get_response'] = functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)(functools.partial(get_response, store))
+    return store
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    # Reloads when a new bundle has been published since the store was built
+    global _store
+    with _store_lock:
+        if _store is None or artifacts.get_latest_version() != _store['latest']:
+            _store = load_store(data_store.get_dashboard_years())
+        return _store
+
+
+# QUERIES
+
+def parse_query(store, dataset, query):
+    # Returns ({parameter: sorted values}, format); raises ValueError on an invalid query
+    params = urllib.parse.parse_qs(query, keep_blank_values=True)
+    output_format = params.pop('format', ['json'])[-1]
+    if output_format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+    filters = {}
+    for param, values in params.items():
+        if param not in FILTERS:
+            raise ValueError(f"unknown parameter '{param}'")
+        if FILTERS[param] not in store['frames'][dataset].columns:
+            raise ValueError(f"'{dataset}' cannot be filtered by {param}")
+        filters[param] = sorted({value for item in values for value in item.split(',') if value})
+    return filters, output_format
+
+def select_rows(store, dataset, filters):
+    df = store['frames'][dataset]
+    rows = None
+    for param, values in filters.items():
+        index = store['indexes'][dataset][param]
+        matches = [index[value] for value in values if value in index]
+        param_rows = np.concatenate(matches) if matches else np.array([], dtype=np.intp)
+        rows = param_rows if rows is None else np.intersect1d(rows, param_rows, assume_unique=True)
+    if rows is None:
+        return df
+    return df.iloc[np.sort(rows)].reset_index(drop=True)
+
+def encode_frame(df, output_format):
+    if output_format == 'json':
+        return df.to_json(orient='records').encode('utf-8')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def get_etag(store, dataset, filters, output_format):
+    key = json.dumps([store['version'], dataset, filters, output_format], sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def get_response(store, dataset, filters_key, output_format, use_gzip):
+    # Returns (body, etag, compressed); filters_key: json.dumps of the normalized filters
+    filters = json.loads(filters_key)
+    body = encode_frame(select_rows(store, dataset, filters), output_format)
+    etag = get_etag(store, dataset, filters, output_format)
+    compressed = use_gzip and len(body) >= MIN_GZIP_BYTES
+    if compressed:
+        body = gzip.compress(body, compresslevel=6, mtime=0)
+        etag = f'{etag}-gzip'  # Strong ETags differ per content encoding
+    return body, f'"{etag}"', compressed
+
+def get_index(store):
+    return {
+        'version': store['version'],
+        'years': store['years'],
+        'formats': list(FORMATS),
+        'datasets': {
+            name: {
+                'source': DATASETS[name][1],
+                'rows': len(df),
+                'columns': [str(col) for col in df.columns],
+                'filters': list(store['indexes'][name])
+            }
+            for name, df in store['frames'].items()
+        }
+    }
+
+
+# HTTP
+
+def accepts_gzip(header):
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*') and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            return True
+    return False
+
+def matches_etag(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+class AggregatesHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        dataset = url.path.strip('/')
+        store = get_store()
+
+        if not dataset:
+            self.send_body(200, json.dumps(get_index(store), indent=2).encode('utf-8'), 'application/json')
+            return
+        if dataset not in store['frames']:
+            self.send_error_json(404, f"unknown dataset '{dataset}'")
+            return
+        try:
+            filters, output_format = parse_query(store, dataset, url.query)
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+
+        use_gzip = accepts_gzip(self.headers.get('Accept-Encoding'))
+        body, etag, compressed = store['get_response'](dataset, json.dumps(filters, sort_keys=True), output_format, use_gzip)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if matches_etag(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        if compressed:
+            headers['Content-Encoding'] = 'gzip'
+        self.send_body(200, body, FORMATS[output_format], headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({'error': message}).encode('utf-8'), 'application/json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard aggregates as JSON or Arrow over HTTP.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)  # clean_data/ is read relative to the project root
+    store = get_store()
+    print(f"Serving {', '.join(store['frames'])} ({store['version']}) on http://{args.host}:{args.port}/")
+    server = http.server.ThreadingHTTPServer((args.host, args.port), AggregatesHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import data_store
+
+# Versioned bundle of the clean and derived dashboard frames, written at ETL time
+# (scripts/build_dashboard_artifacts.py) so the app never recomputes them:
+#   clean_data/dashboard/<version>/<frame>.arrow + manifest.json
+#   clean_data/dashboard/LATEST  -> name of the current version
+#
+# Frames are uncompressed Arrow IPC files. Readers memory-map them read-only, so every
+# Streamlit worker on the host shares the same page-cache pages instead of holding a
+# private parsed copy. Versions are immutable: publishing a new one only swaps LATEST.
+# pandas / pyarrow are imported where frames are read or written, so resolving LATEST stays cheap.
+
+BUNDLE_DIR = 'dashboard'
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+BUNDLE_FORMAT = 7  # Bumped whenever the frame layout or columns change (3: Q1 Top N ranks, 4: budget quantiles, 5: institution stats, 6: monthly series, 7: award size quantiles per state)
+
+BUNDLE_FRAMES = [
+    'df_state_grants',
+    'q1_combined',
+    'df_scatter',
+    'df_div',
+    'cancelled_by_state_year',
+    'combined_q4',
+    'combined_q5_with_states',
+    'q5_segments',
+    'budget_quantiles',
+    'institution_stats',
+    'monthly_series'
+]
+OPTIONAL_FRAMES = ['monthly_series']  # Left out when the inputs cannot produce them (files without StartDate)
+CLEAN_FRAMES = ['df_complete', 'budget_sketches']  # Published for other consumers, not loaded by the app
+
+
+def get_bundle_root(data_dir=data_store.CLEAN_DATA_DIR):
+    return os.path.join(data_dir, BUNDLE_DIR)
+
+def get_frame_digest(df):
+    import pandas as pd
+    digest = hashlib.sha256(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def write_text_atomic(path, text):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_arrow(df, path):
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+def read_arrow(path):
+    # Zero-copy for numeric columns without nulls: the arrays point into the mapped file
+    # and stay valid for as long as the frame is referenced
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+# WRITE
+
+def write_bundle(frames, years, data_dir=data_store.CLEAN_DATA_DIR):
+    root = get_bundle_root(data_dir)
+    os.makedirs(root, exist_ok=True)
+
+    names = [name for name in BUNDLE_FRAMES if name not in OPTIONAL_FRAMES or frames.get(name) is not None]
+    names += [name for name in CLEAN_FRAMES if name in frames]
+    frames = {name: frames[name].reset_index(drop=True) for name in names}
+    digests = {name: get_frame_digest(df) for name, df in frames.items()}
+
+    # Content-addressed version: unchanged frames produce the same bundle
+    version_digest = hashlib.sha256(json.dumps([years, digests], sort_keys=True).encode('utf-8'))
+    version = f'v{BUNDLE_FORMAT}-{version_digest.hexdigest()[:12]}'
+    bundle_dir = os.path.join(root, version)
+
+    if not os.path.exists(os.path.join(bundle_dir, MANIFEST_FILE)):
+        tmp_dir = os.path.join(root, f'.{version}.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'version': version,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'years': list(years),
+            'frames': {}
+        }
+        for name, df in frames.items():
+            file_name = f'{name}.arrow'
+            write_arrow(df, os.path.join(tmp_dir, file_name))
+            manifest['frames'][name] = {
+                'file': file_name,
+                'rows': len(df),
+                'columns': [str(col) for col in df.columns],
+                'sha256': digests[name]
+            }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(bundle_dir, ignore_errors=True)
+        os.replace(tmp_dir, bundle_dir)
+
+    write_text_atomic(os.path.join(root, LATEST_FILE), version)
+    return version
+
+
+# READ
+
+def get_latest_version(data_dir=data_store.CLEAN_DATA_DIR):
+    path = os.path.join(get_bundle_root(data_dir), LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip() or None
+
+def load_manifest(version, data_dir=data_store.CLEAN_DATA_DIR):
+    path = os.path.join(get_bundle_root(data_dir), version, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_bundle(years=None, data_dir=data_store.CLEAN_DATA_DIR, version=None, names=BUNDLE_FRAMES):
+    # Returns None when there is no bundle for the requested years
+    if version is None:
+        version = get_latest_version(data_dir)
+    if version is None:
+        return None
+
+    manifest = load_manifest(version, data_dir)
+    if manifest is None or manifest.get('format') != BUNDLE_FORMAT:
+        return None
+    if years is not None and manifest['years'] != list(years):
+        return None
+
+    bundle_dir = os.path.join(get_bundle_root(data_dir), version)
+    return {
+        name: read_arrow(os.path.join(bundle_dir, manifest['frames'][name]['file']))
+        for name in names if name in manifest['frames']
+    }
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+import threading
+import altair as alt
+
+# Altair data transformer that writes each chart dataset to a content-hashed JSON file and
+# references it by URL, instead of inlining the rows in the spec. Identical rows map to the
+# same file, so a dataset is written once and re-rendering unchanged data writes nothing.
+
+DATA_DIR = 'chart_data'
+TRANSFORMER_NAME = 'content_hashed_json'
+
+# The active data transformer is global to Altair: concurrent sessions convert one chart at a time
+_transformer_lock = threading.Lock()
+
+
+def write_dataset(data, data_dir=DATA_DIR):
+    # Returns the file name (<sha256 prefix>.json) of the dataset rows
+    values = alt.utils.data.to_values(data)['values']
+    content = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    filename = f'{hashlib.sha256(content).hexdigest()[:16]}.json'
+    path = os.path.join(data_dir, filename)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(f'{path}.tmp', path)
+    return filename
+
+def to_content_hashed_json(data, data_dir=DATA_DIR, urlpath=None):
+    # urlpath: URL prefix of data_dir as seen by the renderer (defaults to data_dir, relative)
+    filename = write_dataset(data, data_dir)
+    urlpath = data_dir.replace(os.sep, '/') if urlpath is None else urlpath
+    return {'url': f"{urlpath.rstrip('/')}/{filename}", 'format': {'type': 'json'}}
+
+def register_transformer():
+    if TRANSFORMER_NAME not in alt.data_transformers.names():
+        alt.data_transformers.register(TRANSFORMER_NAME, to_content_hashed_json)
+
+def enable_external_data(data_dir=DATA_DIR, urlpath=None):
+    register_transformer()
+    alt.data_transformers.enable(TRANSFORMER_NAME, data_dir=data_dir, urlpath=urlpath)
+
+def get_external_spec(chart, data_dir=DATA_DIR, urlpath=None):
+    # chart.to_dict() with its datasets written to data_dir and referenced by URL (the spec keeps
+    # the encodings, params and layout only); the enabled transformer is left unchanged
+    register_transformer()
+    with _transformer_lock, alt.data_transformers.enable(TRANSFORMER_NAME, data_dir=data_dir, urlpath=urlpath):
+        return chart.to_dict()
+
+def get_dataset_paths(spec, data_dir=DATA_DIR):
+    # Local files of the datasets referenced by an external spec
+    paths = set()
+    nodes = [spec]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, dict):
+            data = node.get('data')
+            if isinstance(data, dict) and data.get('format', {}).get('type') == 'json' and 'url' in data:
+                paths.add(os.path.join(data_dir, data['url'].rsplit('/', 1)[-1]))
+            nodes.extend(node.values())
+        elif isinstance(node, list):
+            nodes.extend(node)
+    return sorted(paths)
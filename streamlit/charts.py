@@ -1,9 +1,11 @@
 
 import pandas as pd
-import numpy as np
-import altair as alt
-import math
-from vega_datasets import data as vega_data
+import data_store
+
+# altair (the slowest import here) and numpy are imported by get_visualization only:
+# the data functions (ETL, query backends) never need them.
+
+US_10M_TOPOJSON_URL = 'https://cdn.jsdelivr.net/npm/vega-datasets@v1.29.0/data/us-10m.json'  # vega_datasets.data.us_10m.url
 
 
 def get_mappings():
@@ -17,24 +19,35 @@ def get_mappings():
         'state_lon': dict(zip(df_states['StateCode'], df_states['Longitude']))
     }
 
-def get_award_data(mappings):
-    df_awards = pd.read_csv('clean_data/nsf_awards_full.csv')
-    df_cancellations = pd.read_csv('clean_data/nsf_cancellations.csv')
+def get_parties(state_codes, years, mappings):
+    # Governing party of each state in each (fiscal) year: 2020 election winners until 2024, 2024 ones after
+    state_codes = state_codes.astype('object')
+    party_2020 = state_codes.map(mappings['state_party_2020'])
+    party_2025 = state_codes.map(mappings['state_party_2025'])
+    return party_2020.where(years <= 2024, party_2025).fillna('Unknown')
+
+def get_award_data(mappings, years=None, df_awards=None, df_cancellations=None):
+    # df_awards / df_cancellations: frames already in memory (ETL pipeline), otherwise read from clean_data/
+    if years is None:
+        years = data_store.get_dashboard_years()
+    if df_awards is None:
+        df_awards = data_store.read_awards(years)
+    else:
+        df_awards = df_awards[df_awards['Year'].isin(years)]
+    if df_cancellations is None:
+        df_cancellations = data_store.read_cancellations()
 
-    state_party_2020_map = mappings['state_party_2020']
-    state_party_2025_map = mappings['state_party_2025']
     state_name_map = mappings['state_name']
 
-    # Check how many cancelled grants are already in the main dataset
-    cancelled_ids = set(df_cancellations['AwardID'].astype(str))
-    main_ids = set(df_awards['AwardID'].astype(str))
-    missing = cancelled_ids - main_ids
+    # Cancelled grants missing from the main dataset: anti-join on the int64 AwardID keys
+    # (hash-based isin, no string conversion)
+    missing = ~df_cancellations['AwardID'].isin(df_awards['AwardID'])
 
-    # Filter missing cancellations that have valid Year (2021-2025) and StateCode
+    # Filter missing cancellations that have valid Year (displayed range) and StateCode
     missing_cancellations = df_cancellations[
-        (df_cancellations['AwardID'].astype(str).isin(missing)) &
+        missing &
         (df_cancellations['Year'].notna()) &
-        (df_cancellations['Year'].between(2021, 2025)) &  # Only years in our dataset range
+        (df_cancellations['Year'].between(years[0], years[-1])) &  # Only years in our dataset range
         (df_cancellations['StateCode'].notna())
     ][['AwardID', 'StateCode', 'Year', 'EstimatedBudget']].copy()
 
@@ -49,36 +62,29 @@ def get_award_data(mappings):
     ], ignore_index=True)
 
     # Add governing party in each grant State
-    df_complete['Party'] = df_complete.apply(  # Political party based on the year
-        lambda row: state_party_2020_map.get(row['StateCode'], 'Unknown') if row['Year'] <= 2024
-        else state_party_2025_map.get(row['StateCode'], 'Unknown'), axis=1
-    )
+    df_complete['Party'] = get_parties(df_complete['StateCode'], df_complete['Year'], mappings)
 
     return df_complete
 
 def get_state_grants_data(df_complete, mappings):
-    state_party_2020_map = mappings['state_party_2020']
-    state_party_2025_map = mappings['state_party_2025']
+    df_state_grants = df_complete.groupby(['StateCode', 'StateName', 'Year']).size().reset_index(name='GrantCount')
+    return add_state_grants_columns(df_state_grants, mappings)
+
+def add_state_grants_columns(df_state_grants, mappings):
     state_fips_map = mappings['state_fips']
     state_lat_map = mappings['state_lat']
     state_lon_map = mappings['state_lon']
 
     # Grant Share (%) of all grants correspoding to each state
-    df_state_grants = df_complete.groupby(['StateCode', 'StateName', 'Year']).size().reset_index(name='GrantCount')
-    year_totals = df_state_grants.groupby('Year')['GrantCount'].sum().to_dict()
-    df_state_grants['GrantRate'] = df_state_grants.apply(
-        lambda row: (row['GrantCount'] / year_totals[row['Year']]) * 100, axis=1
-    )
+    year_totals = df_state_grants.groupby('Year')['GrantCount'].transform('sum')
+    df_state_grants['GrantRate'] = (df_state_grants['GrantCount'] / year_totals) * 100
 
     # Add map topology data
     df_state_grants['id'] = df_state_grants['StateCode'].map(state_fips_map)
     df_state_grants['latitude'] = df_state_grants['StateCode'].map(state_lat_map)
     df_state_grants['longitude'] = df_state_grants['StateCode'].map(state_lon_map)
 
-    df_state_grants['Party'] = df_state_grants.apply(  # Political party based on the year
-        lambda row: state_party_2020_map.get(row['StateCode'], 'Unknown') if row['Year'] <= 2024
-        else state_party_2025_map.get(row['StateCode'], 'Unknown'), axis=1
-    )
+    df_state_grants['Party'] = get_parties(df_state_grants['StateCode'], df_state_grants['Year'], mappings)
     return df_state_grants
 
 
@@ -100,111 +106,136 @@ def get_q1_data(df_state_grants, mappings):
     q1_all_years['Year'] = YEAR_ALL_INDICATOR
     q1_all_years['Party'] = q1_all_years['StateCode'].map(state_party_2020_map)
     q1_combined = pd.concat([df_state_grants, q1_all_years], ignore_index=True)
-    return q1_combined 
-
-
-def get_q5_cancellation_data(mappings):
-    df_cancellations = pd.read_csv('clean_data/nsf_cancellations.csv')
-    state_name_map = mappings['state_name']
-    state_party_2020_map = mappings['state_party_2020']
-    state_party_2025_map = mappings['state_party_2025']
-
-    df_cancellations['StateName'] = df_cancellations['StateCode'].map(state_name_map)
+    return add_q1_ranks(q1_combined)
+
+def add_q1_ranks(q1_combined):
+    # Top N ranks by Grant Share for each year, among all states (party filter 'All') and within
+    # the state's party. Ties share the lowest rank, as the Vega-Lite 'rank' window op.
+    q1_combined['RankAll'] = q1_combined.groupby('Year')['GrantRate'].rank(
+        method='min', ascending=False
+    ).astype(int)
+    q1_combined['RankParty'] = q1_combined.groupby(['Year', 'Party'], dropna=False, observed=True)['GrantRate'].rank(
+        method='min', ascending=False
+    ).astype(int)
+    return q1_combined
+
+
+def get_q5_cancellation_data(mappings, years=None, df_cancellations=None):
+    # df_cancellations: frame already in memory (shared by the app loaders), otherwise read from clean_data/
+    if years is None:
+        years = data_store.get_dashboard_years()
+    if df_cancellations is None:
+        df_cancellations = data_store.read_cancellations(years)
+    else:
+        df_cancellations = df_cancellations[df_cancellations['Year'].isin(years)]
+
+    df_cancellations = df_cancellations.assign(StateName=df_cancellations['StateCode'].map(mappings['state_name']))
     cancelled_by_state_year = df_cancellations.groupby(['Year', 'StateCode', 'StateName', 'Status']).agg(
         Count=('AwardID', 'count')
     ).reset_index()
+    return add_q5_columns(cancelled_by_state_year, mappings)
+
+def add_q5_columns(cancelled_by_state_year, mappings):
+    state_name_map = mappings['state_name']
+
     cancelled_by_state_year['Year'] = cancelled_by_state_year['Year'].astype(int)
     cancelled_by_state_year['StateName'] = cancelled_by_state_year['StateCode'].map(state_name_map)
-    cancelled_by_state_year['Party'] = cancelled_by_state_year.apply(  # Political party based on the year
-        lambda row: state_party_2020_map.get(row['StateCode'], 'Unknown') if row['Year'] <= 2024
-        else state_party_2025_map.get(row['StateCode'], 'Unknown'), axis=1
-    )
+    cancelled_by_state_year['Party'] = get_parties(cancelled_by_state_year['StateCode'], cancelled_by_state_year['Year'], mappings)
     return cancelled_by_state_year
 
-def get_q2_data():
+def get_q2_data(years=None, df_awards=None, df_cancellations=None):
+    # df_awards / df_cancellations: frames already in memory (shared by the app loaders), otherwise read from clean_data/
+    if years is None:
+        years = data_store.get_dashboard_years()
+    if df_awards is None:
+        df_awards = data_store.read_awards(years)
+    else:
+        df_awards = df_awards[df_awards['Year'].isin(years)]
+    if df_cancellations is None:
+        df_cancellations = data_store.read_cancellations(years)
+    else:
+        df_cancellations = df_cancellations[df_cancellations['Year'].isin(years)]
+
+    def count_awards(keys, name):
+        return df_awards.groupby(keys)['AwardID'].count().reset_index(name=name)
+
+    def count_cancellations(status, keys, name):
+        df_status = df_cancellations[df_cancellations['Status'] == status]
+        return df_status.groupby(keys)['AwardID'].count().reset_index(name=name)
+
+    return get_q2_frames(count_awards, count_cancellations, len(years))
+
+def add_cancel_rates(df, num_years=1):
+    # Cancelled, CancelRate and TerminationRate from the Terminated / Reinstated counts;
+    # num_years: TotalGrants is a yearly average over that many years (scalar or per row)
+    df['Cancelled'] = df['Terminated'] + df['Reinstated']
+    df['CancelRate'] = (df['Cancelled'] / (df['TotalGrants'] * num_years)) * 100
+    df['TerminationRate'] = (df['Terminated'] / df['Cancelled'] * 100).where(df['Cancelled'] > 0, 0)
+    return df
+
+def get_q2_frames(count_awards, count_cancellations, num_years):
+    # count_awards(keys, name) / count_cancellations(status, keys, name) return grouped counts
     YEAR_ALL_INDICATOR = 0
-    NUM_YEARS = 5
-
-    df_awards = pd.read_csv('clean_data/nsf_awards_full.csv')
-    df_cancellations = pd.read_csv('clean_data/nsf_cancellations.csv')
-    df_terminated = df_cancellations[df_cancellations['Status'] == 'Terminated'].copy()
-    df_reinstated = df_cancellations[df_cancellations['Status'] == 'Reinstated'].copy()
-
+    NUM_YEARS = num_years
 
     # Directorate aggregation (All years, yearly average)
-    dir_full_all = df_awards.groupby(['DirectorateAbbr', 'Directorate'])['AwardID'].count().reset_index(name='TotalGrants')
-    dir_term_all = df_terminated.groupby('DirectorateAbbr')['AwardID'].count().reset_index(name='Terminated')
-    dir_reinst_all = df_reinstated.groupby('DirectorateAbbr')['AwardID'].count().reset_index(name='Reinstated')
+    dir_full_all = count_awards(['DirectorateAbbr', 'Directorate'], 'TotalGrants')
+    dir_term_all = count_cancellations('Terminated', ['DirectorateAbbr'], 'Terminated')
+    dir_reinst_all = count_cancellations('Reinstated', ['DirectorateAbbr'], 'Reinstated')
 
     df_dir_all = dir_full_all.merge(dir_term_all, on='DirectorateAbbr', how='left')
     df_dir_all = df_dir_all.merge(dir_reinst_all, on='DirectorateAbbr', how='left')
 
     df_dir_all['Terminated'] = df_dir_all['Terminated'].fillna(0)
     df_dir_all['Reinstated'] = df_dir_all['Reinstated'].fillna(0)
-    df_dir_all['Cancelled'] = df_dir_all['Terminated'] + df_dir_all['Reinstated']
     df_dir_all['TotalGrants'] = df_dir_all['TotalGrants'] / NUM_YEARS
-    df_dir_all['CancelRate'] = (df_dir_all['Cancelled'] / (df_dir_all['TotalGrants'] * NUM_YEARS)) * 100
-    df_dir_all['TerminationRate'] = df_dir_all.apply(
-        lambda r: (r['Terminated'] / r['Cancelled'] * 100) if r['Cancelled'] > 0 else 0, axis=1
-    )
+    df_dir_all = add_cancel_rates(df_dir_all, NUM_YEARS)
 
     df_dir_all['Year'] = YEAR_ALL_INDICATOR
 
     # Directorate aggregation (By year)
-    dir_full_year = df_awards.groupby(['DirectorateAbbr', 'Directorate', 'Year'])['AwardID'].count().reset_index(name='TotalGrants')
-    dir_term_year = df_terminated.groupby(['DirectorateAbbr', 'Year'])['AwardID'].count().reset_index(name='Terminated')
-    dir_reinst_year = df_reinstated.groupby(['DirectorateAbbr', 'Year'])['AwardID'].count().reset_index(name='Reinstated')
+    dir_full_year = count_awards(['DirectorateAbbr', 'Directorate', 'Year'], 'TotalGrants')
+    dir_term_year = count_cancellations('Terminated', ['DirectorateAbbr', 'Year'], 'Terminated')
+    dir_reinst_year = count_cancellations('Reinstated', ['DirectorateAbbr', 'Year'], 'Reinstated')
 
     df_dir_year = dir_full_year.merge(dir_term_year, on=['DirectorateAbbr', 'Year'], how='left')
     df_dir_year = df_dir_year.merge(dir_reinst_year, on=['DirectorateAbbr', 'Year'], how='left')
 
     df_dir_year['Terminated'] = df_dir_year['Terminated'].fillna(0)
     df_dir_year['Reinstated'] = df_dir_year['Reinstated'].fillna(0)
-    df_dir_year['Cancelled'] = df_dir_year['Terminated'] + df_dir_year['Reinstated']
-    df_dir_year['CancelRate'] = (df_dir_year['Cancelled'] / df_dir_year['TotalGrants']) * 100
-    df_dir_year['TerminationRate'] = df_dir_year.apply(
-        lambda r: (r['Terminated'] / r['Cancelled'] * 100) if r['Cancelled'] > 0 else 0, axis=1
-    )
+    df_dir_year = add_cancel_rates(df_dir_year)
 
     # Major directorates (>=100 grants)
     df_scatter = pd.concat([df_dir_all, df_dir_year], ignore_index=True)
-    major_dirs = df_awards.groupby('DirectorateAbbr')['AwardID'].count()
-    major_dirs = major_dirs[major_dirs >= 100].index.tolist()
+    major_dirs = count_awards(['DirectorateAbbr'], 'TotalGrants')
+    major_dirs = major_dirs.loc[major_dirs['TotalGrants'] >= 100, 'DirectorateAbbr'].tolist()
     df_scatter = df_scatter[df_scatter['DirectorateAbbr'].isin(major_dirs)]
 
     # Division aggregation (All years, yearly average)
-    div_full_all = df_awards.groupby(['DirectorateAbbr', 'Directorate', 'DivisionAbbr', 'Division'])['AwardID'].count().reset_index(name='TotalGrants')
-    div_term_all = df_terminated.groupby(['DirectorateAbbr', 'DivisionAbbr'])['AwardID'].count().reset_index(name='Terminated')
-    div_reinst_all = df_reinstated.groupby(['DirectorateAbbr', 'DivisionAbbr'])['AwardID'].count().reset_index(name='Reinstated')
+    div_full_all = count_awards(['DirectorateAbbr', 'Directorate', 'DivisionAbbr', 'Division'], 'TotalGrants')
+    div_term_all = count_cancellations('Terminated', ['DirectorateAbbr', 'DivisionAbbr'], 'Terminated')
+    div_reinst_all = count_cancellations('Reinstated', ['DirectorateAbbr', 'DivisionAbbr'], 'Reinstated')
 
     df_div_all = div_full_all.merge(div_term_all, on=['DirectorateAbbr', 'DivisionAbbr'], how='left')
     df_div_all = df_div_all.merge(div_reinst_all, on=['DirectorateAbbr', 'DivisionAbbr'], how='left')
 
     df_div_all['Terminated'] = df_div_all['Terminated'].fillna(0)
     df_div_all['Reinstated'] = df_div_all['Reinstated'].fillna(0)
-    df_div_all['Cancelled'] = df_div_all['Terminated'] + df_div_all['Reinstated']
     df_div_all['TotalGrants'] = df_div_all['TotalGrants'] / NUM_YEARS
-    df_div_all['CancelRate'] = (df_div_all['Cancelled'] / (df_div_all['TotalGrants'] * NUM_YEARS)) * 100
-    df_div_all['TerminationRate'] = df_div_all.apply(
-        lambda r: (r['Terminated'] / r['Cancelled'] * 100) if r['Cancelled'] > 0 else 0, axis=1
-    )
+    df_div_all = add_cancel_rates(df_div_all, NUM_YEARS)
     df_div_all['Year'] = YEAR_ALL_INDICATOR
 
     # Division aggregation (By year)
-    div_full_year = df_awards.groupby(['DirectorateAbbr', 'Directorate', 'DivisionAbbr', 'Division', 'Year'])['AwardID'].count().reset_index(name='TotalGrants')
-    div_term_year = df_terminated.groupby(['DirectorateAbbr', 'DivisionAbbr', 'Year'])['AwardID'].count().reset_index(name='Terminated')
-    div_reinst_year = df_reinstated.groupby(['DirectorateAbbr', 'DivisionAbbr', 'Year'])['AwardID'].count().reset_index(name='Reinstated')
+    div_full_year = count_awards(['DirectorateAbbr', 'Directorate', 'DivisionAbbr', 'Division', 'Year'], 'TotalGrants')
+    div_term_year = count_cancellations('Terminated', ['DirectorateAbbr', 'DivisionAbbr', 'Year'], 'Terminated')
+    div_reinst_year = count_cancellations('Reinstated', ['DirectorateAbbr', 'DivisionAbbr', 'Year'], 'Reinstated')
 
     df_div_year = div_full_year.merge(div_term_year, on=['DirectorateAbbr', 'DivisionAbbr', 'Year'], how='left')
     df_div_year = df_div_year.merge(div_reinst_year, on=['DirectorateAbbr', 'DivisionAbbr', 'Year'], how='left')
 
     df_div_year['Terminated'] = df_div_year['Terminated'].fillna(0)
     df_div_year['Reinstated'] = df_div_year['Reinstated'].fillna(0)
-    df_div_year['Cancelled'] = df_div_year['Terminated'] + df_div_year['Reinstated']
-    df_div_year['CancelRate'] = (df_div_year['Cancelled'] / df_div_year['TotalGrants']) * 100
-    df_div_year['TerminationRate'] = df_div_year.apply(
-        lambda r: (r['Terminated'] / r['Cancelled'] * 100) if r['Cancelled'] > 0 else 0, axis=1
-    )
+    df_div_year = add_cancel_rates(df_div_year)
 
     # Combine divisions
     df_div = pd.concat([df_div_all, df_div_year], ignore_index=True)
@@ -212,7 +243,119 @@ def get_q2_data():
 
     return df_scatter, df_div
 
-def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, config):
+def get_q4_data(df_complete):
+    # Total budget per year (All) and per year and party
+    yearly_totals = df_complete.groupby('Year', observed=True).agg(
+        TotalBudget=('EstimatedBudget', 'sum')
+    ).reset_index()
+    yearly_totals['Group'] = 'All'
+
+    yearly_party_totals = df_complete.groupby(['Year', 'Party'], observed=True).agg(
+        TotalBudget=('EstimatedBudget', 'sum')
+    ).reset_index()
+
+    yearly_party_totals['Group'] = yearly_party_totals['Party']
+    return pd.concat([yearly_totals, yearly_party_totals], ignore_index=True)
+
+
+def get_q5_evolution_data(df_state_grants):
+    q5_all_avg = df_state_grants.groupby('Year', observed=True).agg(GrantCount=('GrantCount', 'mean')).reset_index()
+    q5_all_avg['Group'] = 'All'
+    q5_all_avg['StateName'] = 'All States (Avg)'
+
+    q5_by_state = df_state_grants.copy()
+    q5_by_state['Group'] = q5_by_state['Party']
+
+    combined_q5_with_states = pd.concat([
+        q5_all_avg[['Year', 'Group', 'GrantCount', 'StateName']],
+        q5_by_state[['Year', 'Group', 'GrantCount', 'StateName', 'StateCode', 'Party']]
+    ], ignore_index=True)
+    return combined_q5_with_states, create_segments(combined_q5_with_states)
+
+def create_segments(df, x='Year'):
+    # x: time column ('Year', or 'Month' for the monthly series)
+    segments = []
+    for state in df['StateName'].unique():
+        state_df = df[df['StateName'] == state].sort_values(x)
+        times = state_df[x].values
+        counts = state_df['GrantCount'].values
+        groups = state_df['Group'].values
+        for i in range(len(times) - 1):
+            segments.append({
+                'StateName': state, f'{x}_from': times[i], f'{x}_to': times[i + 1],
+                'Count_from': counts[i], 'Count_to': counts[i + 1], 'Group': groups[i + 1]
+            })
+    return pd.DataFrame(segments)
+
+
+# COMPACT REPRESENTATION
+
+CATEGORICAL_COLUMNS = ['InstitutionID', 'Institution', 'StateCode', 'StateName', 'Party', 'Group', 'Directorate', 'DirectorateAbbr', 'Division', 'DivisionAbbr', 'Status']
+FLOAT32_COLUMNS = ['GrantRate', 'latitude', 'longitude', 'CancelRate', 'TerminationRate']
+
+def get_shared_categories(frames):
+    # One dictionary per column, shared by every frame that holds it
+    shared = {}
+    for col in CATEGORICAL_COLUMNS:
+        values = set()
+        for df in frames.values():
+            if col in df.columns:
+                values.update(df[col].dropna().unique().tolist())
+        if values:
+            shared[col] = pd.CategoricalDtype(sorted(values))
+    return shared
+
+def compact_frame(df, shared_categories):
+    df = df.copy()
+    for col in df.columns:
+        if col in shared_categories:
+            df[col] = df[col].astype(shared_categories[col])
+        elif col == 'AwardID':
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif col in FLOAT32_COLUMNS:
+            df[col] = df[col].astype('float32')
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[col]) and df[col].notna().all() and (df[col] % 1 == 0).all():
+            # Whole-dollar budgets and averaged counts that happen to be integral
+            df[col] = pd.to_numeric(df[col].astype('int64'), downcast='integer')
+    return df
+
+def compact_frames(frames):
+    shared_categories = get_shared_categories(frames)
+    return {name: compact_frame(df, shared_categories) for name, df in frames.items()}
+
+def get_memory_report(frames_before, frames_after):
+    rows = []
+    for name, df in frames_before.items():
+        before = df.memory_usage(deep=True).sum()
+        after = frames_after[name].memory_usage(deep=True).sum()
+        rows.append({
+            'Frame': name,
+            'Rows': len(df),
+            'BytesBefore': before,
+            'BytesAfter': after,
+            'Reduction (%)': round((1 - after / before) * 100, 1) if before > 0 else 0.0
+        })
+    report = pd.DataFrame(rows)
+    total = {
+        'Frame': 'Total',
+        'Rows': report['Rows'].sum(),
+        'BytesBefore': report['BytesBefore'].sum(),
+        'BytesAfter': report['BytesAfter'].sum()
+    }
+    total['Reduction (%)'] = round((1 - total['BytesAfter'] / total['BytesBefore']) * 100, 1) if total['BytesBefore'] > 0 else 0.0
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+
+PARTY_FILTER_OPTIONS = ['All', 'Republican', 'Democrat']  # Party dropdown (party_filter)
+
+def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, config,
+                      combined_q4=None, combined_q5_with_states=None, q5_segments=None, budget_quantiles=None,
+                      monthly_series=None):
+    import math
+    import numpy as np
+    import altair as alt
 
     # CONSTANTS
 
@@ -231,6 +374,8 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
 
     LINE_CHART_WIDTH = config['LINE_CHART_WIDTH']
     LINE_CHART_HEIGHT = config['LINE_CHART_HEIGHT']
+    TIME_RESOLUTION = config['TIME_RESOLUTION']
+    LINE_MAX_POINTS = config['LINE_MAX_POINTS']
 
     # Legend
     LEGEND_WIDTH = config['LEGEND_WIDTH']
@@ -251,6 +396,10 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
     BUBBLE_HEADER_OFFSET = config['BUBBLE_HEADER_OFFSET']
     BUTTERFLY_HEADER_OFFSET = config['BUTTERFLY_HEADER_OFFSET']
 
+    # Q6 Award Size
+    Q6_WIDTH = config['Q6_WIDTH']
+    Q6_HEIGHT = config['Q6_HEIGHT']
+
     # --- Colors ---
     COLOR_DEMOCRAT = config['COLOR_DEMOCRAT']
     COLOR_REPUBLICAN = config['COLOR_REPUBLICAN']
@@ -282,6 +431,7 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
     POINT_SIZE_DEFAULT = config['POINT_SIZE_DEFAULT']
     POINT_SIZE_SELECTED = config['POINT_SIZE_SELECTED']
     POINT_SIZE_UNSELECTED = config['POINT_SIZE_UNSELECTED']
+    POINT_SIZE_MONTHLY = config['POINT_SIZE_MONTHLY']
 
     # --- Offsets ---
     PARTY_LEGEND_OFFSET_Y = config['PARTY_LEGEND_OFFSET_Y']
@@ -333,7 +483,7 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
 
     # Party dropdown
     party_input = alt.binding_select(
-        options=['All', 'Republican', 'Democrat'],
+        options=PARTY_FILTER_OPTIONS,
         name='Party Filter: '
     )
     party_param = alt.param(name='party_filter', value='All', bind=party_input)
@@ -385,14 +535,13 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
 
     # Q1: BAR CHART + MAP
 
-    # Bar Chart
+    # Bar Chart (ranks precomputed in get_q1_data, so Top N is a threshold filter)
     base_bars = alt.Chart(q1_combined).transform_filter(
         alt.datum.Year == year_param
     ).transform_filter(
         "(party_filter == 'All') || (datum.Party == party_filter)"
-    ).transform_window(
-        rank='rank(GrantRate)',
-        sort=[alt.SortField('GrantRate', order='descending')]
+    ).transform_calculate(
+        rank="party_filter == 'All' ? datum.RankAll : datum.RankParty"
     ).transform_filter(
         alt.datum.rank <= topn_param
     )
@@ -444,7 +593,7 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
     bar_chart = (bars + rule_outline + rule_color)
 
     # Map
-    us_states_geo = alt.topo_feature(vega_data.us_10m.url, "states")
+    us_states_geo = alt.topo_feature(US_10M_TOPOJSON_URL, "states")
 
     background = alt.Chart(us_states_geo).mark_geoshape(
         fill=COLOR_BACKGROUND_MAP,
@@ -554,7 +703,7 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
 
     Q5_WIDTH = BAR_WIDTH + MAP_WIDTH + 20
 
-    max_cancelled_count = cancelled_by_state_year.groupby(['Year', 'StateName'])['Count'].sum().max()
+    max_cancelled_count = cancelled_by_state_year.groupby(['Year', 'StateName'], observed=True)['Count'].sum().max()
     q5_2_x_domain = [0, max_cancelled_count * 1.1 if max_cancelled_count > 0 else 5]
 
     q5_2_chart = alt.Chart(cancelled_by_state_year).mark_bar().encode(
@@ -949,7 +1098,7 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
     ).resolve_scale(color='independent').properties(
         title=alt.TitleParams(
             text='Grant Distribution and Cancellation Rate by Directorate',
-            subtitle='Click a directorate bubble to drill-down into divisions. Only major directorates (≥100 total grants across 2021-2025)',
+            subtitle=f'Click a directorate bubble to drill-down into divisions. Only major directorates (≥100 total grants across {YEARS_LIST[0]}-{YEARS_LIST[-1]})',
             fontSize=16, offset=-10
         )
     )
@@ -964,22 +1113,66 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
     range=['#2E7D32', '#4A90D9', '#E8843C']
     )
 
-    yearly_totals = df_complete.groupby('Year').agg(
-    TotalBudget=('EstimatedBudget', 'sum')
-    ).reset_index()
-    yearly_totals['Group'] = 'All'
+    # Time axis: award start months (monthly series, downsampled per line) or fiscal years
+    monthly = TIME_RESOLUTION == 'month' and monthly_series is not None and len(monthly_series) > 0
+    if monthly:
+        import timeseries
+        combined_q4 = timeseries.get_budget_series(monthly_series, LINE_MAX_POINTS)
+        combined_q5_with_states = timeseries.get_state_series(monthly_series, LINE_MAX_POINTS)
+        # Segments (colored by the party of their end point) are derived in the browser from the
+        # points, so the rows are sent once
+        q5_segment_source = alt.Chart(combined_q5_with_states).transform_window(
+            Month_to='lead(Month)', Count_to='lead(GrantCount)', Group_to='lead(Group)',
+            groupby=['StateName'], sort=[alt.SortField('Month')]
+        ).transform_filter('isValid(datum.Month_to)').transform_calculate(
+            Month_from='datum.Month', Count_from='datum.GrantCount', Group='datum.Group_to'
+        )
 
-    yearly_party_totals = df_complete.groupby(['Year', 'Party']).agg(
-        TotalBudget=('EstimatedBudget', 'sum')
-    ).reset_index()
-    
-    yearly_party_totals['Group'] = yearly_party_totals['Party']
-    combined_q4 = pd.concat([yearly_totals, yearly_party_totals], ignore_index=True)
+        time_axis = alt.Axis(labelAngle=0, title='Award Start Month', format='%Y', tickCount='year')
+        time_x = alt.X('Month:T', axis=time_axis)
+        time_x_from = alt.X('Month_from:T', axis=time_axis)
+        time_x_to = 'Month_to:T'
+        time_field = 'Month:T'
+        time_tooltip = alt.Tooltip('Month:T', title='Month', format='%b %Y')
+        line_point_size = POINT_SIZE_MONTHLY
+    else:
+        if combined_q4 is None:
+            combined_q4 = get_q4_data(df_complete)
+        if combined_q5_with_states is None or q5_segments is None:
+            combined_q5_with_states, q5_segments = get_q5_evolution_data(df_state_grants)
+        q5_segment_source = alt.Chart(q5_segments)
+
+        time_x = alt.X('Year:O', axis=alt.Axis(labelAngle=0, title='Fiscal Year'))
+        time_x_from = alt.X('Year_from:O', title='Fiscal Year', axis=alt.Axis(labelAngle=0))
+        time_x_to = 'Year_to:O'
+        time_field = 'Year:O'
+        time_tooltip = alt.Tooltip('Year:O', title='Year')
+        line_point_size = POINT_SIZE_DEFAULT
+
+    def layer_with_year_rule(*layers):
+        # Selected fiscal year: a rule on the year axis (on top), a band (Oct 1 - Sep 30) behind the
+        # lines on the month axis
+        if monthly:
+            df_fiscal_years = pd.DataFrame({
+                'Year': YEARS_LIST,
+                'Start': [pd.Timestamp(year - 1, 10, 1) for year in YEARS_LIST],
+                'End': [pd.Timestamp(year, 10, 1) for year in YEARS_LIST]
+            })
+            year_rule = alt.Chart(df_fiscal_years).mark_rect(color='gray', opacity=OPACITY_YEAR_RULE / 4).encode(
+                x='Start:T', x2='End:T'
+            )
+        else:
+            year_rule = alt.Chart(pd.DataFrame({'Year': YEARS_LIST})).mark_rule(
+                strokeDash=[5, 5], strokeWidth=2, color='gray', opacity=OPACITY_YEAR_RULE
+            ).encode(x='Year:O')
+        year_rule = year_rule.transform_filter(f"year_select != '{YEAR_ALL_INDICATOR}'").transform_filter("datum.Year == year_select")
+        return alt.layer(year_rule, *layers) if monthly else alt.layer(*layers, year_rule)
 
     # Q4 & Q5.1 LINE CHARTS (FINAL VERSION)
 
     # --- Q4: Budget Evolution ---
     q4_y_max = combined_q4['TotalBudget'].max() * 1.05
+    q4_y_domain_max = q4_y_max / 1000000000 if monthly else q4_y_max // 1000000000
     q4_color_scale = alt.Scale(domain=['All', 'Democrat', 'Republican'], range=[COLOR_ALL_PARTY, COLOR_DEMOCRAT, COLOR_REPUBLICAN])
 
     q4_base = alt.Chart(combined_q4).transform_filter(
@@ -987,66 +1180,35 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
     ).transform_calculate(TotalBudgetBillions='datum.TotalBudget / 1000000000')
 
     q4_line = q4_base.mark_line(strokeWidth=2).encode(
-        x=alt.X('Year:O', axis=alt.Axis(labelAngle=0, title='Fiscal Year')),
-        y=alt.Y('TotalBudgetBillions:Q', title='Budget ($B)', scale=alt.Scale(domain=[0, q4_y_max // 1000000000])),
+        x=time_x,
+        y=alt.Y('TotalBudgetBillions:Q', title='Budget ($B)', scale=alt.Scale(domain=[0, q4_y_domain_max])),
         color=alt.Color('Group:N', scale=q4_color_scale, legend=alt.Legend(title='Party', orient='right')),
         opacity=alt.value(OPACITY_LINE)
     )
 
-    q4_points = q4_base.mark_circle(size=POINT_SIZE_DEFAULT).encode(
-        x='Year:O', y='TotalBudgetBillions:Q',
+    q4_points = q4_base.mark_circle(size=line_point_size).encode(
+        x=time_field, y='TotalBudgetBillions:Q',
         color=alt.Color('Group:N', scale=q4_color_scale, legend=None),
-        tooltip=['Year:O', 'Group:N', alt.Tooltip('TotalBudget:Q', format='$,.0f')]
+        tooltip=[time_tooltip, 'Group:N', alt.Tooltip('TotalBudget:Q', format='$,.0f')]
     )
 
-    q4_year_rule = alt.Chart(pd.DataFrame({'Year': YEARS_LIST})).mark_rule(
-        strokeDash=[5, 5], strokeWidth=2, color='gray', opacity=OPACITY_YEAR_RULE
-    ).encode(x='Year:O').transform_filter(f"year_select != '{YEAR_ALL_INDICATOR}'").transform_filter("datum.Year == year_select")
-
-    q4_chart = (q4_line + q4_points + q4_year_rule).properties(
+    q4_chart = layer_with_year_rule(q4_line, q4_points).properties(
         title='Grants Total Budget Evolution Over Time',
         width=LINE_CHART_WIDTH, height=BAR_HEIGHT - Q4_HEIGHT_OFFSET
     )
 
     # --- Q5.1: State Grants Evolution ---
-    q5_all_avg = df_state_grants.groupby('Year').agg(GrantCount=('GrantCount', 'mean')).reset_index()
-    q5_all_avg['Group'] = 'All'
-    q5_all_avg['StateName'] = 'All States (Avg)'
-
-    q5_by_state = df_state_grants.copy()
-    q5_by_state['Group'] = q5_by_state['Party']
-
-    combined_q5_with_states = pd.concat([
-        q5_all_avg[['Year', 'Group', 'GrantCount', 'StateName']],
-        q5_by_state[['Year', 'Group', 'GrantCount', 'StateName', 'StateCode', 'Party']]
-    ], ignore_index=True)
-
-    def create_segments(df):
-        segments = []
-        for state in df['StateName'].unique():
-            state_df = df[df['StateName'] == state].sort_values('Year')
-            years = state_df['Year'].values
-            counts = state_df['GrantCount'].values
-            groups = state_df['Group'].values
-            for i in range(len(years) - 1):
-                segments.append({
-                    'StateName': state, 'Year_from': years[i], 'Year_to': years[i + 1],
-                    'Count_from': counts[i], 'Count_to': counts[i + 1], 'Group': groups[i + 1]
-                })
-        return pd.DataFrame(segments)
-
-    q5_segments = create_segments(combined_q5_with_states)
     q5_y_max = combined_q5_with_states['GrantCount'].max() * 1.05
     q5_color_scale_grouped = alt.Scale(domain=['All', 'Democrat', 'Republican'], range=[COLOR_ALL_PARTY, COLOR_DEMOCRAT, COLOR_REPUBLICAN])
 
-    q5_line_base = alt.Chart(q5_segments).transform_filter(
+    q5_line_base = q5_segment_source.transform_filter(
         "!length(data('state_click_store')) ? datum.Group == 'All' : true"
     ).transform_filter(state_selection).transform_filter(
         "(party_filter == 'All') || (datum.Group == 'All') || (datum.Group == party_filter)"
     )
 
     q5_part1_line = q5_line_base.mark_rule(strokeWidth=2, opacity=OPACITY_LINE).encode(
-        x=alt.X('Year_from:O', title='Fiscal Year', axis=alt.Axis(labelAngle=0)), x2='Year_to:O',
+        x=time_x_from, x2=time_x_to,
         y=alt.Y('Count_from:Q', title='Grant Count (Avg/Actual)', scale=alt.Scale(domain=[0, q5_y_max])), y2='Count_to:Q',
         color=alt.Color('Group:N', scale=q5_color_scale_grouped, legend=None)
     )
@@ -1057,22 +1219,80 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
         "(party_filter == 'All') || (datum.Group == 'All') || (datum.Group == party_filter)"
     )
 
-    q5_part1_points = q5_points_base.mark_circle(size=POINT_SIZE_DEFAULT).encode(
-        x='Year:O', y=alt.Y('mean(GrantCount):Q', scale=alt.Scale(domain=[0, q5_y_max])),
+    q5_part1_points = q5_points_base.mark_circle(size=line_point_size).encode(
+        x=time_field, y=alt.Y('mean(GrantCount):Q', scale=alt.Scale(domain=[0, q5_y_max])),
         color=alt.Color('Group:N', scale=q5_color_scale_grouped),
-        tooltip=[alt.Tooltip('Year:O', title='Year'), alt.Tooltip('StateName:N', aggregate='min', title='State'),
+        tooltip=[time_tooltip, alt.Tooltip('StateName:N', aggregate='min', title='State'),
                 alt.Tooltip('Group:N', title='Category'), alt.Tooltip('mean(GrantCount):Q', title='Count', format='.0f')]
     )
 
-    q5_year_rule = alt.Chart(pd.DataFrame({'Year': YEARS_LIST})).mark_rule(
-        strokeDash=[5, 5], strokeWidth=2, color='gray', opacity=OPACITY_YEAR_RULE
-    ).encode(x='Year:O').transform_filter(f"year_select != '{YEAR_ALL_INDICATOR}'").transform_filter("datum.Year == year_select")
-
-    q5_part1_chart = (q5_part1_line + q5_part1_points + q5_year_rule).properties(
+    q5_part1_chart = layer_with_year_rule(q5_part1_line, q5_part1_points).properties(
         title={'text': 'State Grants Evolution (Average/Selected)'},
         width=LINE_CHART_WIDTH, height=LINE_CHART_HEIGHT
     )
 
+    # Q6: AWARD SIZE (BUDGET QUANTILES)
+
+    # Median and P90 award size per directorate, read from the merged budget sketches (sketches.py)
+    q6_chart = None
+    if budget_quantiles is not None:
+        # All states: the per-state rows are published (bundle, aggregates server), not charted
+        budget_quantiles = budget_quantiles[budget_quantiles['StateCode'] == 'All'].drop(columns='StateCode')
+        q6_status_scale = alt.Scale(domain=['Active', 'Cancelled'], range=[COLOR_VOLUME, COLOR_IMPACT])
+        q6_y = alt.Y('DirectorateAbbr:N', title=None, sort=alt.EncodingSortField(field='Awards', op='sum', order='descending'))
+        q6_tooltip = [
+            alt.Tooltip('DirectorateAbbr:N', title='Directorate'),
+            alt.Tooltip('Status:N'),
+            alt.Tooltip('Awards:Q', format=','),
+            alt.Tooltip('Median:Q', format='$,.0f'),
+            alt.Tooltip('P90:Q', format='$,.0f', title='90th Percentile')
+        ]
+
+        q6_base = alt.Chart(budget_quantiles).transform_filter(
+            alt.datum.Year == year_param
+        ).transform_filter(
+            "datum.Party == party_filter"
+        ).transform_calculate(
+            MedianMillions='datum.Median / 1000000',
+            P90Millions='datum.P90 / 1000000'
+        )
+
+        q6_range = q6_base.mark_rule(strokeWidth=STROKE_WIDTH_SYMBOL, opacity=OPACITY_LINE).encode(
+            y=q6_y,
+            yOffset='Status:N',
+            x=alt.X('MedianMillions:Q', title='Award Size ($M): Median to 90th Percentile'),
+            x2='P90Millions:Q',
+            color=alt.Color('Status:N', scale=q6_status_scale, legend=alt.Legend(title='Status', orient='top')),
+            tooltip=q6_tooltip
+        )
+
+        q6_median = q6_base.mark_circle(size=POINT_SIZE_DEFAULT, opacity=OPACITY_ACTIVE).encode(
+            y=q6_y,
+            yOffset='Status:N',
+            x='MedianMillions:Q',
+            color=alt.Color('Status:N', scale=q6_status_scale, legend=None),
+            tooltip=q6_tooltip
+        )
+
+        q6_p90 = q6_base.mark_tick(thickness=2, size=10).encode(
+            y=q6_y,
+            yOffset='Status:N',
+            x='P90Millions:Q',
+            color=alt.Color('Status:N', scale=q6_status_scale, legend=None),
+            tooltip=q6_tooltip
+        )
+
+        q6_chart = (q6_range + q6_median + q6_p90).properties(
+            title={
+                'text': 'Award Size by Directorate',
+                'subtitle': 'Median (dot) to 90th percentile (tick) of the award budget, active vs cancelled grants',
+                'anchor': 'start',
+                'fontSize': 16
+            },
+            width=Q6_WIDTH,
+            height=Q6_HEIGHT
+        )
+
     # FINAL DASHBOARD ASSEMBLY
 
     left_side = alt.vconcat(q1_row, q5_2_chart, spacing=VCONCAT_SPACING).resolve_scale(color='independent')
@@ -1081,11 +1301,13 @@ def get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combi
 
     middle_row = alt.hconcat(left_side, right_side, spacing=HCONCAT_SPACING).resolve_scale(color='independent')
 
-    final_dashboard = alt.vconcat(middle_row, q2_chart, spacing=BOTTOM_SPACING).add_params(
+    bottom_rows = [q2_chart] if q6_chart is None else [q2_chart, q6_chart]
+
+    final_dashboard = alt.vconcat(middle_row, *bottom_rows, spacing=BOTTOM_SPACING).add_params(
         year_param, topn_param, party_param
     ).properties(
         title=alt.TitleParams(
-            text='NSF Grant Dashboard (2021-2025)',
+            text=f'NSF Grant Dashboard ({YEARS_LIST[0]}-{YEARS_LIST[-1]})',
             subtitle='Overview of grants and 2025 cancellations. Filter by Year/Party or click Map/Bubble to explore.',
             anchor='middle',
             fontSize=DASHBOARD_TITLE_FONT_SIZE,
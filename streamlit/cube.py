@@ -0,0 +1,149 @@
+import pandas as pd
+import charts
+import data_store
+
+# Precomputed rollup cube: one cell per
+# state x party x directorate x division x year x status (x present in the awards file),
+# holding grant counts and budget sums. Every dashboard aggregate is answered by
+# summing cells, so the award rows are scanned only once, when the cube is built.
+
+STATUS_AWARDED = 'Awarded'  # Award rows (nsf_awards); cancellation rows keep their Status
+
+DIMENSIONS = [
+    'StateCode', 'StateName', 'Party',
+    'DirectorateAbbr', 'Directorate', 'DivisionAbbr', 'Division',
+    'Year', 'Status', 'InAwards'
+]
+MEASURES = ['Count', 'Budget']
+
+
+AWARD_COLUMNS = ['AwardID'] + [col for col in DIMENSIONS if col not in ('Party', 'Status', 'InAwards')] + ['EstimatedBudget']
+
+
+def get_cells(facts, mappings):
+    # Fact rows (award or cancellation) -> cube cells
+    facts = facts.assign(Party=charts.get_parties(facts['StateCode'], facts['Year'], mappings))
+    return facts.groupby(DIMENSIONS, dropna=False, observed=True).agg(
+        Count=('Year', 'size'),
+        Budget=('EstimatedBudget', 'sum')
+    ).reset_index()
+
+def merge_cells(cells):
+    # Cells of disjoint fact batches -> one cell per dimension combination
+    return pd.concat(cells, ignore_index=True).groupby(DIMENSIONS, dropna=False, observed=True)[MEASURES].sum().reset_index()
+
+def get_award_facts(df_awards):
+    df_awards = df_awards[AWARD_COLUMNS].copy()
+    df_awards['Status'] = STATUS_AWARDED
+    df_awards['InAwards'] = True
+    return df_awards
+
+def get_cancellation_facts(df_cancellations, in_awards, mappings):
+    # Cancelled grants use the reference state names (same as charts.get_award_data)
+    df_cancellations = df_cancellations.copy()
+    df_cancellations['StateName'] = df_cancellations['StateCode'].map(mappings['state_name'])
+    df_cancellations['InAwards'] = in_awards
+    return df_cancellations
+
+def build_cube(mappings, years=None, df_awards=None, df_cancellations=None, chunksize=None):
+    # df_awards / df_cancellations: frames already in memory (ETL pipeline), otherwise read from clean_data/
+    # chunksize: stream the award files in batches of this many rows (out-of-core build). Batches are folded
+    # into running cells, so peak memory depends on the batch size and the number of cells (dimension
+    # combinations), not on the number of awards.
+    if years is None:
+        years = data_store.get_dashboard_years()
+    df_cancellations, in_awards, batches = data_store.scan_awards(years, AWARD_COLUMNS, df_awards, df_cancellations, chunksize)
+
+    cells = None
+    for batch in batches:
+        batch_cells = get_cells(get_award_facts(batch), mappings)
+        cells = batch_cells if cells is None else merge_cells([cells, batch_cells])
+
+    cancellation_cells = get_cells(get_cancellation_facts(df_cancellations, in_awards, mappings), mappings)
+    return cancellation_cells if cells is None else merge_cells([cells, cancellation_cells])
+
+
+# SLICES
+
+def is_awarded(cube):
+    return cube['Status'] == STATUS_AWARDED
+
+def is_cancelled(cube, status=None):
+    if status is None:
+        return cube['Status'] != STATUS_AWARDED
+    return cube['Status'] == status
+
+def is_complete(cube):
+    # All grants: awards plus cancelled grants missing from the awards file (charts.get_award_data)
+    return is_awarded(cube) | (~cube['InAwards'].astype(bool) & cube['StateCode'].notna())
+
+def rollup(cube, by, mask=None):
+    cells = cube if mask is None else cube[mask]
+    return cells.groupby(by, observed=True)[MEASURES].sum().reset_index()
+
+
+# DASHBOARD FRAMES
+
+def get_state_grants_data(cube, mappings):
+    df_state_grants = rollup(cube, ['StateCode', 'StateName', 'Year'], is_complete(cube))
+    df_state_grants = df_state_grants.drop(columns=['Budget']).rename(columns={'Count': 'GrantCount'})
+    return charts.add_state_grants_columns(df_state_grants, mappings)
+
+def get_q5_cancellation_data(cube, mappings):
+    cancelled_by_state_year = rollup(cube, ['Year', 'StateCode', 'StateName', 'Status'], is_cancelled(cube))
+    cancelled_by_state_year = cancelled_by_state_year.drop(columns=['Budget'])
+    return charts.add_q5_columns(cancelled_by_state_year, mappings)
+
+def get_q2_data(cube, num_years):
+    def count_awards(keys, name):
+        counts = rollup(cube, keys, is_awarded(cube))
+        return counts[keys + ['Count']].rename(columns={'Count': name})
+
+    def count_cancellations(status, keys, name):
+        counts = rollup(cube, keys, is_cancelled(cube, status))
+        return counts[keys + ['Count']].rename(columns={'Count': name})
+
+    return charts.get_q2_frames(count_awards, count_cancellations, num_years)
+
+def get_q4_data(cube):
+    complete = is_complete(cube)
+
+    yearly_totals = rollup(cube, ['Year'], complete)
+    yearly_totals = yearly_totals[['Year', 'Budget']].rename(columns={'Budget': 'TotalBudget'})
+    yearly_totals['Group'] = 'All'
+
+    yearly_party_totals = rollup(cube, ['Year', 'Party'], complete)
+    yearly_party_totals = yearly_party_totals[['Year', 'Party', 'Budget']].rename(columns={'Budget': 'TotalBudget'})
+    yearly_party_totals['Group'] = yearly_party_totals['Party']
+    return pd.concat([yearly_totals, yearly_party_totals], ignore_index=True)
+
+def get_directorate_state_data(cube):
+    # Cross-filter: grants, cancellations and budget per directorate and state
+    grants = rollup(cube, ['StateCode', 'StateName', 'DirectorateAbbr', 'Directorate', 'Year'], is_complete(cube))
+    cancelled = rollup(cube, ['StateCode', 'DirectorateAbbr', 'Year', 'Status'], is_cancelled(cube))
+    cancelled = cancelled.pivot_table(
+        index=['StateCode', 'DirectorateAbbr', 'Year'], columns='Status', values='Count', fill_value=0
+    ).reset_index()
+    df = grants.rename(columns={'Count': 'TotalGrants', 'Budget': 'TotalBudget'}).merge(
+        cancelled, on=['StateCode', 'DirectorateAbbr', 'Year'], how='left'
+    )
+    for status in ['Terminated', 'Reinstated']:
+        df[status] = df[status].fillna(0) if status in df.columns else 0
+    return df
+
+
+def get_dashboard_frames(mappings, years=None, df_awards=None, df_cancellations=None, chunksize=None):
+    if years is None:
+        years = data_store.get_dashboard_years()
+    cube = build_cube(mappings, years, df_awards, df_cancellations, chunksize)
+
+    df_state_grants = get_state_grants_data(cube, mappings)
+    df_scatter, df_div = get_q2_data(cube, len(years))
+    return {
+        'df_state_grants': df_state_grants,
+        'q1_combined': charts.get_q1_data(df_state_grants, mappings),
+        'df_scatter': df_scatter,
+        'df_div': df_div,
+        'cancelled_by_state_year': get_q5_cancellation_data(cube, mappings),
+        'combined_q4': get_q4_data(cube)
+    }
@@ -0,0 +1,223 @@
+import json
+import os
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_FILE = os.path.join(PROJECT_DIR, 'config.json')
+
+CLEAN_DATA_DIR = 'clean_data'
+AWARDS_PARTITION_DIR = 'nsf_awards'  # One CSV per fiscal year
+AWARDS_FULL_FILE = 'nsf_awards_full.csv'  # Single-file layout (e.g. Colab uploads)
+AWARDS_INDEX_FILE = 'nsf_awards_index.arrow'  # All awards sorted by AwardID, for per-award lookups
+CANCELLATIONS_FILE = 'nsf_cancellations.csv'
+
+AWARD_ID_DTYPE = 'int64'  # AwardID is an integer key from the ETL to the dashboard
+DICTIONARY_COLUMNS = ['InstitutionID', 'Institution']  # Dictionary-encoded in the award index (few values, many rows)
+
+# numpy / pandas / pyarrow are imported by the functions that use them: the year range helpers
+# are also used by the app's cold path (cached chart spec), which never touches a frame
+
+
+# YEAR RANGE
+
+def load_config():
+    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def get_year_range(key):
+    year_range = load_config()[key]
+    return list(range(int(year_range['start']), int(year_range['end']) + 1))
+
+def get_fiscal_years():
+    # Years processed by the ETL
+    return get_year_range('fiscal_years')
+
+def get_dashboard_years():
+    # Years displayed (and loaded) by the dashboard
+    return get_year_range('dashboard_years')
+
+
+# AWARD PARTITIONS
+
+def get_award_partition_path(year, data_dir=CLEAN_DATA_DIR):
+    return os.path.join(data_dir, AWARDS_PARTITION_DIR, f'nsf_awards_{year}.csv')
+
+def get_award_partition_paths(years, data_dir=CLEAN_DATA_DIR):
+    paths = [get_award_partition_path(year, data_dir) for year in years]
+    return [path for path in paths if os.path.exists(path)]
+
+def write_award_partition(df_year, year, data_dir=CLEAN_DATA_DIR):
+    path = get_award_partition_path(year, data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df_year.to_csv(path, index=False)
+    return path
+
+def read_awards(years=None, usecols=None, data_dir=CLEAN_DATA_DIR):
+    import pandas as pd
+    if years is None:
+        years = get_dashboard_years()
+
+    paths = get_award_partition_paths(years, data_dir)
+    if paths:
+        frames = [pd.read_csv(path, usecols=usecols, dtype={'AwardID': AWARD_ID_DTYPE}) for path in paths]
+        return pd.concat(frames, ignore_index=True)
+
+    # Fall back to the single-file layout, keeping only the requested years
+    read_cols = None if usecols is None else list(dict.fromkeys(list(usecols) + ['Year']))
+    df_awards = pd.read_csv(os.path.join(data_dir, AWARDS_FULL_FILE), usecols=read_cols, dtype={'AwardID': AWARD_ID_DTYPE})
+    df_awards = df_awards[df_awards['Year'].isin(years)]
+    if usecols is not None and 'Year' not in usecols:
+        df_awards = df_awards.drop(columns=['Year'])
+    return df_awards.reset_index(drop=True)
+
+def iter_awards(years=None, usecols=None, chunksize=100_000, data_dir=CLEAN_DATA_DIR):
+    # Same rows as read_awards, in batches of at most `chunksize` rows (out-of-core aggregation)
+    import pandas as pd
+    if years is None:
+        years = get_dashboard_years()
+
+    paths = get_award_partition_paths(years, data_dir)
+    if paths:
+        for path in paths:
+            yield from pd.read_csv(path, usecols=usecols, dtype={'AwardID': AWARD_ID_DTYPE}, chunksize=chunksize)
+        return
+
+    read_cols = None if usecols is None else list(dict.fromkeys(list(usecols) + ['Year']))
+    chunks = pd.read_csv(
+        os.path.join(data_dir, AWARDS_FULL_FILE), usecols=read_cols, dtype={'AwardID': AWARD_ID_DTYPE}, chunksize=chunksize
+    )
+    for chunk in chunks:
+        chunk = chunk[chunk['Year'].isin(years)]
+        if usecols is not None and 'Year' not in usecols:
+            chunk = chunk.drop(columns=['Year'])
+        yield chunk
+
+def scan_awards(years, usecols, df_awards=None, df_cancellations=None, chunksize=100_000):
+    # One pass over the award rows of the years, for the aggregates that also count the cancelled grants
+    # missing from the awards (rollup cube, budget sketches, institution stats, monthly series).
+    # df_awards / df_cancellations: frames already in memory (ETL pipeline), otherwise read from clean_data/,
+    # the award files streamed in batches of `chunksize` rows (None: read at once).
+    # Returns (cancellations of the years, in_awards, award batches): in_awards flags the cancellations
+    # found in the awards, and is complete once the batches have been consumed.
+    import pandas as pd
+    if df_cancellations is None:
+        df_cancellations = read_cancellations()
+    df_cancellations = df_cancellations[df_cancellations['Year'].isin(years)]
+    in_awards = pd.Series(False, index=df_cancellations.index)
+
+    if df_awards is not None:
+        batches = [df_awards[usecols]]
+    elif chunksize is None:
+        batches = [read_awards(years, usecols=usecols)]
+    else:
+        batches = iter_awards(years, usecols=usecols, chunksize=chunksize)
+
+    def scan():
+        for batch in batches:
+            batch = batch[batch['Year'].isin(years)]
+            in_awards[df_cancellations['AwardID'].isin(batch['AwardID'])] = True
+            yield batch
+    return df_cancellations, in_awards, scan()
+
+def get_missing_cancellations(df_cancellations, in_awards):
+    # Cancelled grants missing from the awards, counted with them when they have a state (charts.get_award_data)
+    return df_cancellations[~in_awards & df_cancellations['StateCode'].notna()]
+
+
+# AWARD IDS
+
+def parse_award_ids(df, source):
+    # Raw rows -> rows with an int64 AwardID: blank or non-integer IDs are reported and dropped,
+    # instead of failing the whole ETL (they cannot be joined with the awards anyway)
+    import pandas as pd
+    award_ids = pd.to_numeric(df['AwardID'], errors='coerce')
+    invalid = award_ids.isna() | (award_ids % 1 != 0)
+    if invalid.any():
+        examples = ', '.join(repr(award_id) for award_id in df.loc[invalid, 'AwardID'].unique()[:5])
+        print(f"{source}: dropped {invalid.sum()} rows with an invalid AwardID ({examples})")
+    return df[~invalid].assign(AwardID=award_ids[~invalid].astype(AWARD_ID_DTYPE))
+
+
+# CANCELLATIONS
+
+def read_cancellations(years=None, data_dir=CLEAN_DATA_DIR):
+    # All cancellations unless `years` is given
+    import pandas as pd
+    df_cancellations = pd.read_csv(os.path.join(data_dir, CANCELLATIONS_FILE), dtype={'AwardID': AWARD_ID_DTYPE})
+    if years is not None:
+        df_cancellations = df_cancellations[df_cancellations['Year'].isin(years)].reset_index(drop=True)
+    return df_cancellations
+
+
+# AWARD INDEX
+
+def get_award_index_path(data_dir=CLEAN_DATA_DIR):
+    return os.path.join(data_dir, AWARDS_INDEX_FILE)
+
+def build_award_index(df_awards):
+    # Sorted int64 keys (stable, so duplicated IDs keep their partition order);
+    # the directorate names ride along as schema metadata
+    import pyarrow as pa
+    df_index = df_awards.assign(AwardID=df_awards['AwardID'].astype(AWARD_ID_DTYPE))
+    df_index = df_index.sort_values('AwardID', kind='stable').reset_index(drop=True)
+    df_index = df_index.astype({col: 'category' for col in DICTIONARY_COLUMNS if col in df_index.columns})
+    directorates = df_awards.groupby('DirectorateAbbr')['Directorate'].first().to_dict()
+
+    table = pa.Table.from_pandas(df_index, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), b'directorates': json.dumps(directorates).encode('utf-8')}
+    return table.replace_schema_metadata(metadata).combine_chunks()
+
+def write_award_index(table, data_dir=CLEAN_DATA_DIR):
+    # Uncompressed Arrow IPC file, one chunk, so readers can memory-map it
+    import pyarrow as pa
+    path = get_award_index_path(data_dir)
+    tmp_path = f'{path}.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=table.num_rows or None)
+    os.replace(tmp_path, path)
+    return path
+
+def read_award_index(data_dir=CLEAN_DATA_DIR):
+    # Memory-mapped: only the pages touched by a lookup are read from disk
+    import pyarrow as pa
+    path = get_award_index_path(data_dir)
+    if not os.path.exists(path):
+        return None
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+def lookup_awards(award_ids, columns=None, years=None, data_dir=CLEAN_DATA_DIR, table=None):
+    # Award rows for the given IDs (every match, like a merge) found by k binary searches
+    # on the sorted index, O(k log n), instead of scanning all n awards. AwardID is int64.
+    # `table` is an in-memory index (build_award_index); otherwise the index file is used.
+    import numpy as np
+    if years is None:
+        years = get_fiscal_years()
+    keys = np.unique(np.asarray(award_ids, dtype=AWARD_ID_DTYPE))  # sorted
+    usecols = None if columns is None else list(dict.fromkeys(['AwardID'] + list(columns)))
+
+    if table is None:
+        table = read_award_index(data_dir)
+    if table is None:
+        # No index yet (e.g. single-file layout): scan the awards instead
+        df_awards = read_awards(years, usecols=usecols, data_dir=data_dir)
+        return df_awards[df_awards['AwardID'].isin(keys)].reset_index(drop=True)
+
+    award_keys = table.column('AwardID').to_numpy()
+    starts = np.searchsorted(award_keys, keys, side='left')
+    counts = np.searchsorted(award_keys, keys, side='right') - starts
+    # Row numbers of every match: start of each key's run plus the offset within the run
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(starts, counts) + offsets
+
+    df_matches = table.take(rows).to_pandas()
+    df_matches = df_matches[df_matches['Year'].isin(years)].reset_index(drop=True)
+    return df_matches if usecols is None else df_matches[usecols]
+
+def get_directorate_names(years=None, data_dir=CLEAN_DATA_DIR, table=None):
+    # Full directorate name per abbreviation (first occurrence in the awards)
+    if table is None:
+        table = read_award_index(data_dir)
+    if table is not None:
+        return json.loads(table.schema.metadata[b'directorates'])
+    df_awards = read_awards(years, usecols=['Directorate', 'DirectorateAbbr'], data_dir=data_dir)
+    return df_awards.groupby('DirectorateAbbr')['Directorate'].first().to_dict()
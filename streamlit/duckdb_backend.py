@@ -0,0 +1,206 @@
+import os
+import tempfile
+import duckdb
+import data_store
+
+# SQL versions of the charts.get_* aggregations, run by an embedded (in-process)
+# DuckDB over the clean CSV files. Results match the pandas frames row for row.
+
+YEAR_ALL_INDICATOR = 0
+SPILL_DIR = os.path.join(tempfile.gettempdir(), 'nsf_duckdb')  # out-of-core spill
+
+
+def connect(years=None, data_dir=data_store.CLEAN_DATA_DIR):
+    if years is None:
+        years = data_store.get_dashboard_years()
+
+    con = duckdb.connect()
+    con.execute(f"SET threads = {os.cpu_count() or 1}")
+    con.execute(f"SET temp_directory = '{SPILL_DIR}'")
+
+    paths = data_store.get_award_partition_paths(years, data_dir)
+    if not paths:
+        paths = [os.path.join(data_dir, data_store.AWARDS_FULL_FILE)]
+    years_sql = ', '.join(str(year) for year in years)
+
+    con.execute(f"""
+        CREATE VIEW awards AS
+        SELECT * FROM read_csv({paths!r}, union_by_name = true, types = {{'AwardID': 'BIGINT'}})
+        WHERE Year IN ({years_sql})
+    """)
+    con.execute(f"""
+        CREATE VIEW cancellations AS
+        SELECT * FROM read_csv('{os.path.join(data_dir, data_store.CANCELLATIONS_FILE)}', types = {{'AwardID': 'BIGINT'}})
+        WHERE Year IN ({years_sql})
+    """)
+    con.execute(f"""
+        CREATE VIEW states AS
+        SELECT * FROM read_csv('{os.path.join(data_dir, 'us_states.csv')}')
+    """)
+
+    # All grants, cancelled and non-cancelled (charts.get_award_data)
+    con.execute("""
+        CREATE VIEW complete AS
+        WITH combined AS (
+            SELECT AwardID, StateCode, StateName, Year, EstimatedBudget FROM awards
+            UNION ALL
+            SELECT c.AwardID, c.StateCode, s.StateName, c.Year, c.EstimatedBudget
+            FROM cancellations c
+            LEFT JOIN states s ON s.StateCode = c.StateCode
+            WHERE c.StateCode IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM awards a WHERE a.AwardID = c.AwardID)  -- hash anti-join
+        )
+        SELECT combined.*,
+               COALESCE(CASE WHEN combined.Year <= 2024 THEN s.Party2020 ELSE s.Party2025 END, 'Unknown') AS Party
+        FROM combined
+        LEFT JOIN states s ON s.StateCode = combined.StateCode
+    """)
+    return con
+
+
+def get_q1_data(con):
+    # State x year counts and the state "All Years" rollup in one grouping-sets pass,
+    # plus the Top N ranks per year (all states and within each party, as charts.add_q1_ranks)
+    q1_combined = con.execute(f"""
+        WITH counts AS (
+            SELECT StateCode, StateName, Year, GROUPING(Year) AS is_all, COUNT(*) AS GrantCount
+            FROM complete
+            WHERE StateCode IS NOT NULL AND StateName IS NOT NULL
+            GROUP BY GROUPING SETS ((StateCode, StateName, Year), (StateCode, StateName))
+        ),
+        q1 AS (
+            SELECT
+                c.is_all,
+                c.StateCode,
+                c.StateName,
+                COALESCE(c.Year, {YEAR_ALL_INDICATOR}) AS Year,
+                c.GrantCount,
+                (c.GrantCount / SUM(c.GrantCount) OVER (PARTITION BY c.is_all, c.Year)) * 100 AS GrantRate,
+                s.Id AS id,
+                s.Latitude AS latitude,
+                s.Longitude AS longitude,
+                CASE
+                    WHEN c.is_all = 1 THEN s.Party2020
+                    ELSE COALESCE(CASE WHEN c.Year <= 2024 THEN s.Party2020 ELSE s.Party2025 END, 'Unknown')
+                END AS Party
+            FROM counts c
+            LEFT JOIN states s ON s.StateCode = c.StateCode
+        )
+        SELECT
+            StateCode, StateName, Year, GrantCount, GrantRate, id, latitude, longitude, Party,
+            RANK() OVER (PARTITION BY Year ORDER BY GrantRate DESC) AS RankAll,
+            RANK() OVER (PARTITION BY Year, Party ORDER BY GrantRate DESC) AS RankParty
+        FROM q1
+        ORDER BY is_all, StateCode, StateName, Year
+    """).df()
+
+    # Yearly rows without the Top N ranks, like charts.get_state_grants_data
+    df_state_grants = q1_combined[q1_combined['Year'] != YEAR_ALL_INDICATOR].drop(columns=['RankAll', 'RankParty']).reset_index(drop=True)
+    return df_state_grants, q1_combined
+
+
+def get_q5_cancellation_data(con):
+    return con.execute("""
+        SELECT
+            c.Year, c.StateCode, s.StateName, c.Status,
+            COUNT(c.AwardID) AS Count,
+            COALESCE(CASE WHEN c.Year <= 2024 THEN s.Party2020 ELSE s.Party2025 END, 'Unknown') AS Party
+        FROM cancellations c
+        JOIN states s ON s.StateCode = c.StateCode
+        WHERE c.Year IS NOT NULL AND c.Status IS NOT NULL AND s.StateName IS NOT NULL
+        GROUP BY c.Year, c.StateCode, s.StateName, c.Status, s.Party2020, s.Party2025
+        ORDER BY c.Year, c.StateCode, s.StateName, c.Status
+    """).df()
+
+
+def get_rates_data(con, num_years, group_keys, merge_keys):
+    # Grants, terminations and reinstatements per key, by year and rolled up to "All Years"
+    keys_sql = ', '.join(merge_keys)
+    all_keys_sql = ', '.join(group_keys)
+    join_sql = ' AND '.join(f"t.{key} IS NOT DISTINCT FROM g.{key}" for key in merge_keys)
+
+    return con.execute(f"""
+        WITH grants AS (
+            SELECT {all_keys_sql}, Year, GROUPING(Year) AS is_all, COUNT(AwardID) AS Grants
+            FROM awards
+            WHERE {' AND '.join(f"{key} IS NOT NULL" for key in group_keys)}
+            GROUP BY GROUPING SETS (({all_keys_sql}, Year), ({all_keys_sql}))
+        ),
+        cancels AS (
+            SELECT {keys_sql}, Year, GROUPING(Year) AS is_all,
+                   COUNT(AwardID) FILTER (WHERE Status = 'Terminated') AS Terminated,
+                   COUNT(AwardID) FILTER (WHERE Status = 'Reinstated') AS Reinstated
+            FROM cancellations
+            WHERE {' AND '.join(f"{key} IS NOT NULL" for key in merge_keys)}
+            GROUP BY GROUPING SETS (({keys_sql}, Year), ({keys_sql}))
+        ),
+        merged AS (
+            SELECT g.*,
+                   CAST(COALESCE(t.Terminated, 0) AS DOUBLE) AS Terminated,
+                   CAST(COALESCE(t.Reinstated, 0) AS DOUBLE) AS Reinstated
+            FROM grants g
+            LEFT JOIN cancels t ON {join_sql} AND t.is_all = g.is_all AND t.Year IS NOT DISTINCT FROM g.Year
+        )
+        SELECT
+            {all_keys_sql},
+            CASE WHEN is_all = 1 THEN Grants / {num_years} ELSE CAST(Grants AS DOUBLE) END AS TotalGrants,
+            Terminated,
+            Reinstated,
+            Terminated + Reinstated AS Cancelled,
+            CASE
+                WHEN is_all = 1 THEN ((Terminated + Reinstated) / ((Grants / {num_years}) * {num_years})) * 100
+                ELSE ((Terminated + Reinstated) / Grants) * 100
+            END AS CancelRate,
+            CASE
+                WHEN Terminated + Reinstated > 0 THEN Terminated / (Terminated + Reinstated) * 100
+                ELSE 0
+            END AS TerminationRate,
+            COALESCE(Year, {YEAR_ALL_INDICATOR}) AS Year
+        FROM merged
+        WHERE DirectorateAbbr IN (
+            SELECT DirectorateAbbr FROM awards GROUP BY DirectorateAbbr HAVING COUNT(AwardID) >= 100
+        )
+        ORDER BY is_all DESC, {all_keys_sql}, Year
+    """).df()
+
+
+def get_q2_data(con, num_years):
+    df_scatter = get_rates_data(
+        con, num_years,
+        group_keys=['DirectorateAbbr', 'Directorate'],
+        merge_keys=['DirectorateAbbr']
+    )
+    df_div = get_rates_data(
+        con, num_years,
+        group_keys=['DirectorateAbbr', 'Directorate', 'DivisionAbbr', 'Division'],
+        merge_keys=['DirectorateAbbr', 'DivisionAbbr']
+    )
+    return df_scatter, df_div
+
+
+def get_q4_data(con):
+    return con.execute("""
+        SELECT Year, SUM(EstimatedBudget) AS TotalBudget, COALESCE(Party, 'All') AS "Group", Party
+        FROM complete
+        GROUP BY GROUPING SETS ((Year), (Year, Party))
+        ORDER BY GROUPING(Party) DESC, Year, Party
+    """).df()
+
+
+def get_dashboard_frames(years=None, data_dir=data_store.CLEAN_DATA_DIR):
+    if years is None:
+        years = data_store.get_dashboard_years()
+    con = connect(years, data_dir)
+    try:
+        df_state_grants, q1_combined = get_q1_data(con)
+        df_scatter, df_div = get_q2_data(con, len(years))
+        return {
+            'df_state_grants': df_state_grants,
+            'q1_combined': q1_combined,
+            'df_scatter': df_scatter,
+            'df_div': df_div,
+            'cancelled_by_state_year': get_q5_cancellation_data(con),
+            'combined_q4': get_q4_data(con)
+        }
+    finally:
+        con.close()
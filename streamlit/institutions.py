@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import data_store
+
+# Institution dimension: one cell per institution x state x directorate x year x status, holding
+# grant counts and budget sums (Status: 'Awarded' for the award rows, cancellation rows keep theirs).
+# Institutions are keyed by their Unique Entity ID (the name when it is missing) and stored
+# dictionary-encoded in the bundle. Rankings filter and sum these cells, so they never rescan the awards.
+# Cancelled grants get their institution from the awards, so those missing from the awards are left out.
+
+STATUS_AWARDED = 'Awarded'
+
+DIMENSIONS = ['InstitutionID', 'Institution', 'StateCode', 'DirectorateAbbr', 'Year', 'Status']
+AWARD_COLUMNS = ['AwardID', 'InstitutionID', 'Institution', 'StateCode', 'DirectorateAbbr', 'Year', 'EstimatedBudget']
+
+RANKING_COLUMNS = ['Grants', 'Budget', 'Cancelled', 'CancelledBudget']
+
+
+def get_cells(facts):
+    # Fact rows -> cells; rows with a Sign column (cancellation deltas) count -1 / +1
+    signs = facts['Sign'] if 'Sign' in facts.columns else 1
+    facts = facts.assign(Count=signs, Budget=facts['EstimatedBudget'] * signs)
+    return facts.groupby(DIMENSIONS, dropna=False, observed=True)[['Count', 'Budget']].sum().reset_index()
+
+def merge_cells(cells):
+    stats = pd.concat(cells, ignore_index=True)
+    # Key by the Unique Entity ID, or the name when it is missing; one name per institution (latest
+    # year, ties broken by name so the result does not depend on the batches)
+    stats['InstitutionID'] = stats['InstitutionID'].astype('object').fillna(stats['Institution'].astype('object'))
+    stats = stats[stats['InstitutionID'].notna()]
+    names = stats.sort_values(['Year', 'Institution'], ascending=False).drop_duplicates('InstitutionID')
+
+    keys = [col for col in DIMENSIONS if col != 'Institution']
+    stats = stats.groupby(keys, dropna=False, observed=True)[['Count', 'Budget']].sum().reset_index()
+    stats = stats[stats['Count'] != 0].reset_index(drop=True)
+    stats.insert(1, 'Institution', stats['InstitutionID'].map(names.set_index('InstitutionID')['Institution']))
+    return stats
+
+def build_institution_stats(years=None, df_awards=None, df_cancellations=None, chunksize=100_000):
+    if years is None:
+        years = data_store.get_dashboard_years()
+    df_cancellations, _, batches = data_store.scan_awards(years, AWARD_COLUMNS, df_awards, df_cancellations, chunksize)
+
+    cells = []
+    cancelled_institutions = []
+    for batch in batches:
+        cells.append(get_cells(batch.assign(Status=STATUS_AWARDED)))
+        cancelled = batch[batch['AwardID'].isin(df_cancellations['AwardID'])]
+        cancelled_institutions.append(cancelled[['AwardID', 'InstitutionID', 'Institution']])
+
+    institutions = pd.concat(cancelled_institutions, ignore_index=True).drop_duplicates('AwardID')
+    cancellation_facts = df_cancellations.merge(institutions, on='AwardID', how='inner')
+    cells.append(get_cells(cancellation_facts[AWARD_COLUMNS + ['Status']]))
+    return merge_cells(cells)
+
+def update_institution_stats(stats, delta, df_awards):
+    # delta: signed cancellation rows (build_dashboard_artifacts); df_awards: the awards of their
+    # grants, for the institutions. Only the changed grants are read.
+    institutions = df_awards[['AwardID', 'InstitutionID', 'Institution']].drop_duplicates('AwardID')
+    facts = delta.merge(institutions, on='AwardID', how='inner')
+    return merge_cells([stats, get_cells(facts[AWARD_COLUMNS + ['Status', 'Sign']])])
+
+
+# TOP-K
+
+def get_top_institutions(stats, k=10, by='Grants', years=None, states=None, directorates=None):
+    # Top k institutions by one of RANKING_COLUMNS, over the cells of the given years, states and
+    # directorates (None: all). The k best are selected with a partial sort (O(n)), and only
+    # those k are sorted.
+    mask = np.ones(len(stats), dtype=bool)
+    for column, values in [('Year', years), ('StateCode', states), ('DirectorateAbbr', directorates)]:
+        if values is not None:
+            mask &= stats[column].isin(values).to_numpy()
+    cells = stats[mask]
+
+    awarded = (cells['Status'] == STATUS_AWARDED).to_numpy()
+    counts = cells['Count'].to_numpy('int64')  # Stored narrow (compact bundle): widened before summing
+    budgets = cells['Budget'].to_numpy('float64')
+    totals = pd.DataFrame({
+        'Grants': np.where(awarded, counts, 0),
+        'Budget': np.where(awarded, budgets, 0),
+        'Cancelled': np.where(awarded, 0, counts),
+        'CancelledBudget': np.where(awarded, 0, budgets)
+    }).groupby(cells['InstitutionID'].to_numpy()).sum()
+    totals = totals[totals[by] > 0]
+
+    values = totals[by].to_numpy()
+    k = min(k, len(values))
+    if k == 0:
+        return pd.DataFrame(columns=['InstitutionID', 'Institution', 'StateCode'] + RANKING_COLUMNS)
+    top = np.argpartition(-values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind='stable')]
+
+    df_top = totals.iloc[top].rename_axis('InstitutionID').reset_index()
+    details = cells.drop_duplicates('InstitutionID').set_index('InstitutionID')
+    df_top.insert(1, 'Institution', df_top['InstitutionID'].map(details['Institution']))
+    df_top.insert(2, 'StateCode', df_top['InstitutionID'].map(details['StateCode']))
+    return df_top
@@ -0,0 +1,59 @@
+import concurrent.futures
+import time
+import pandas as pd
+
+# Startup data loaders as a small dependency graph: a loader is submitted to a thread pool as soon as
+# the loaders it depends on have finished, so independent loaders overlap (e.g. the award and cancellation
+# CSV reads, then the award -> state grants -> Q1 chain and the Q2 / Q5 counts built from them).
+#
+# loaders: [{'name': ..., 'deps': [...], 'run': run(results)}], run receives the results of its deps
+
+
+def get_critical_path(loaders, timings):
+    # Walk back from the last loader to finish through the dependency that finished last
+    by_name = {loader['name']: loader for loader in loaders}
+    name = max(timings, key=lambda name: timings[name][1])
+    path = [name]
+    while by_name[name]['deps']:
+        name = max(by_name[name]['deps'], key=lambda dep: timings[dep][1])
+        path.append(name)
+    return path[::-1]
+
+def run_loaders(loaders, max_workers=None, initializer=None):
+    # initializer: called in every worker thread (e.g. to attach the Streamlit script run context)
+    # Returns the results by loader name and a report (start/end offsets, critical path)
+    by_name = {loader['name']: loader for loader in loaders}
+    results = {}
+    timings = {}
+    start = time.perf_counter()
+
+    def run_loader(name):
+        loader_start = time.perf_counter()
+        result = by_name[name]['run']({dep: results[dep] for dep in by_name[name]['deps']})
+        return result, loader_start - start, time.perf_counter() - start
+
+    pending = [loader['name'] for loader in loaders]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, initializer=initializer) as executor:
+        running = {}
+        while pending or running:
+            for name in [name for name in pending if all(dep in results for dep in by_name[name]['deps'])]:
+                pending.remove(name)
+                running[executor.submit(run_loader, name)] = name
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                results[name], loader_start, loader_end = future.result()
+                timings[name] = (loader_start, loader_end)
+
+    critical_path = get_critical_path(loaders, timings)
+    report = pd.DataFrame([
+        {
+            'Loader': loader['name'],
+            'Deps': ', '.join(loader['deps']),
+            'Start (s)': round(timings[loader['name']][0], 3),
+            'Seconds': round(timings[loader['name']][1] - timings[loader['name']][0], 3),
+            'Critical Path': loader['name'] in critical_path
+        }
+        for loader in loaders
+    ])
+    return results, report
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import charts
+import data_store
+
+# Mergeable quantile sketches of the award budgets (EstimatedBudget), one per
+# state x party x directorate x year x status (Active / Cancelled) cell.
+#
+# A sketch is a histogram over logarithmic buckets: bucket i holds the budgets in
+# (GAMMA^(i-1), GAMMA^i], so any quantile read from it is within RELATIVE_ACCURACY of the exact
+# value. Sketches are stored as rows (cell dimensions, Bucket, Count) and merging two sketches
+# only adds the counts of equal buckets: every rollup (all years, all states, a party...) is a
+# group-by sum over the cells, and the award rows are scanned once, when the sketches are built.
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+ZERO_BUCKET = -1  # Budgets below $1
+
+STATUS_ACTIVE = 'Active'
+STATUS_CANCELLED = 'Cancelled'  # Terminated or reinstated (in the cancellations file)
+
+CELL_DIMENSIONS = ['StateCode', 'Party', 'DirectorateAbbr', 'Year', 'Status']
+AWARD_COLUMNS = ['AwardID', 'StateCode', 'DirectorateAbbr', 'Year', 'EstimatedBudget']
+
+QUANTILES = {'Median': 0.5, 'P90': 0.9}  # Columns of get_quantiles
+
+
+# BUCKETS
+
+def get_buckets(values):
+    values = np.asarray(values, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buckets = np.ceil(np.log(values) / np.log(GAMMA))
+    return np.where(values >= 1, buckets, ZERO_BUCKET).astype('int16')
+
+def get_bucket_values(buckets):
+    # Representative budget of each bucket: within RELATIVE_ACCURACY of every value in it
+    buckets = np.asarray(buckets, dtype='float64')
+    return np.where(buckets == ZERO_BUCKET, 0.0, 2 * GAMMA ** buckets / (GAMMA + 1))
+
+
+# BUILD
+
+def get_sketches(facts, mappings):
+    # Fact rows (one per grant, with its Status) -> sketch rows
+    facts = facts[facts['EstimatedBudget'].notna()]
+    facts = facts.assign(
+        Party=charts.get_parties(facts['StateCode'], facts['Year'], mappings),
+        Bucket=get_buckets(facts['EstimatedBudget'])
+    )
+
+    return facts.groupby(CELL_DIMENSIONS + ['Bucket'], dropna=False, observed=True).size().reset_index(name='Count')
+
+def merge_sketches(sketches, by=CELL_DIMENSIONS):
+    # Sketch rows of any number of batches -> one sketch per `by` group
+    if isinstance(sketches, list):
+        sketches = pd.concat(sketches, ignore_index=True)
+    return sketches.groupby(by + ['Bucket'], dropna=False, observed=True)['Count'].sum().reset_index()
+
+def build_sketches(mappings, years=None, df_awards=None, df_cancellations=None, chunksize=100_000):
+    # Award batches (data_store.scan_awards) are folded into the sketches (bounded memory)
+    if years is None:
+        years = data_store.get_dashboard_years()
+    df_cancellations, in_awards, batches = data_store.scan_awards(years, AWARD_COLUMNS, df_awards, df_cancellations, chunksize)
+
+    sketches = None
+    for batch in batches:
+        cancelled = batch['AwardID'].isin(df_cancellations['AwardID'])
+        batch = batch.assign(Status=np.where(cancelled, STATUS_CANCELLED, STATUS_ACTIVE))
+        batch_sketches = get_sketches(batch, mappings)
+        sketches = batch_sketches if sketches is None else merge_sketches([sketches, batch_sketches])
+
+    missing = data_store.get_missing_cancellations(df_cancellations, in_awards)
+    missing_sketches = get_sketches(missing[AWARD_COLUMNS].assign(Status=STATUS_CANCELLED), mappings)
+    return missing_sketches if sketches is None else merge_sketches([sketches, missing_sketches])
+
+def update_sketches(sketches, removed_facts, added_facts, mappings):
+    # Grants leave or enter cells (e.g. an award becomes cancelled): removing facts is merging
+    # their sketch with negated counts, so only the changed grants are read
+    removed = get_sketches(removed_facts, mappings)
+    removed['Count'] = -removed['Count']
+    merged = merge_sketches([sketches, removed, get_sketches(added_facts, mappings)])
+    return merged[merged['Count'] != 0].reset_index(drop=True)
+
+
+# QUERIES
+
+def get_quantiles(sketches, by, quantiles=QUANTILES):
+    # Merges the sketches of each `by` group: Awards (count) and one column per quantile
+    merged = merge_sketches(sketches, by).sort_values(by + ['Bucket'], ignore_index=True)
+    groups = merged.groupby(by, dropna=False, observed=True, sort=False)['Count']
+    merged['Cumulative'] = groups.cumsum()
+    merged['Total'] = groups.transform('sum')
+
+    result = merged.drop_duplicates(by)[by + ['Total']].rename(columns={'Total': 'Awards'})
+    for name, q in quantiles.items():
+        # First bucket whose cumulative count passes the (0-based) rank of the quantile
+        hits = merged[merged['Cumulative'] > q * (merged['Total'] - 1)].drop_duplicates(by)
+        result = result.merge(hits[by + ['Bucket']], on=by, how='left')
+        result[name] = get_bucket_values(result.pop('Bucket'))
+    return result.reset_index(drop=True)
+
+def get_budget_quantiles(sketches, year_all_indicator=0):
+    # Median / P90 award size per year (and all years), state (and 'All'), party (and 'All'), directorate and status
+    sketches = sketches.astype({'StateCode': 'object', 'Party': 'object', 'Year': 'int64'})
+    sketches = sketches[sketches['DirectorateAbbr'].notna()]
+    sketches = pd.concat([sketches, sketches.assign(Year=year_all_indicator)], ignore_index=True)
+    sketches = pd.concat([sketches, merge_sketches(sketches.assign(StateCode='All'))], ignore_index=True)
+    sketches = pd.concat([sketches, sketches.assign(Party='All')], ignore_index=True)
+    return get_quantiles(sketches, ['Year', 'StateCode', 'Party', 'DirectorateAbbr', 'Status'])
@@ -0,0 +1,109 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+import data_store
+
+# Dashboard chart spec cached on disk for an artifact bundle version, so a cold Streamlit worker
+# serves the chart without importing pandas, pyarrow, Altair or the chart code:
+#   clean_data/dashboard/specs/<bundle version>-<key>/spec.json + <dataset>.arrow
+# Datasets are stored as the Arrow IPC bytes Streamlit sends to the browser. This relies on
+# st.vega_lite_chart forwarding datasets that are already bytes untouched, which Streamlit does
+# since 1.35 (requirements.txt asks for more recent versions); older versions do not accept them.
+# The key covers everything else the spec depends on: the chart and series code, the configuration,
+# config.json and the Altair version.
+# External specs (datasets referenced by URL, chart_data.py) are cached apart, with the list of
+# their dataset files: they are only served while those files exist.
+
+SPECS_DIR = os.path.join(data_store.CLEAN_DATA_DIR, 'dashboard', 'specs')
+SPEC_FILE = 'spec.json'
+
+STREAMLIT_DIR = os.path.dirname(os.path.abspath(__file__))
+SPEC_SOURCES = [
+    os.path.join(STREAMLIT_DIR, 'charts.py'),
+    os.path.join(STREAMLIT_DIR, 'chart_config.py'),
+    os.path.join(STREAMLIT_DIR, 'chart_data.py'),
+    os.path.join(STREAMLIT_DIR, 'timeseries.py'),  # Monthly Q4 / Q5.1 series and their downsampling
+    data_store.CONFIG_FILE
+]
+
+
+def get_spec_key():
+    digest = hashlib.sha256(importlib.metadata.version('altair').encode('utf-8'))
+    for path in SPEC_SOURCES:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def get_spec_dir(bundle_version, specs_dir=SPECS_DIR, external=False):
+    suffix = '-external' if external else ''
+    return os.path.join(specs_dir, f'{bundle_version}-{get_spec_key()}{suffix}')
+
+def read_entry(spec_dir):
+    # spec.json of a cache entry, or None when it was never written or when a dataset file it
+    # references is gone (the static chart data is not versioned: redeploys and cleanups remove it)
+    path = os.path.join(spec_dir, SPEC_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        cached = json.load(f)
+    if not all(os.path.exists(file) for file in cached.get('files', [])):
+        return None
+    return cached
+
+def read_spec(bundle_version, specs_dir=SPECS_DIR, external=False):
+    # Returns None when the spec of this bundle version (and chart code) is not cached
+    spec_dir = get_spec_dir(bundle_version, specs_dir, external)
+    cached = read_entry(spec_dir)
+    if cached is None:
+        return None
+
+    spec = cached['spec']
+    spec['datasets'] = {}
+    for name in cached['datasets']:
+        with open(os.path.join(spec_dir, f'{name}.arrow'), 'rb') as f:
+            spec['datasets'][name] = f.read()
+    return spec
+
+def get_arrow_bytes(values):
+    # Dataset rows (list of records) -> Arrow IPC stream, the encoding of st.vega_lite_chart datasets
+    import pandas as pd
+    import pyarrow as pa
+    table = pa.Table.from_pandas(pd.DataFrame(values), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def write_spec(bundle_version, spec, specs_dir=SPECS_DIR, external=False, files=()):
+    # spec: chart.to_dict() of the dashboard built from this bundle version (external: the
+    # chart_data.get_external_spec, whose dataset files are `files`)
+
+    spec_dir = get_spec_dir(bundle_version, specs_dir, external)
+    if read_entry(spec_dir) is not None:
+        return spec_dir
+
+    tmp_dir = f'{spec_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    spec = dict(spec)
+    datasets = spec.pop('datasets', {})
+    for name, values in datasets.items():
+        with open(os.path.join(tmp_dir, f'{name}.arrow'), 'wb') as f:
+            f.write(get_arrow_bytes(values))
+    with open(os.path.join(tmp_dir, SPEC_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'spec': spec, 'datasets': list(datasets), 'files': list(files)}, f)
+
+    if os.path.exists(spec_dir):  # Stale entry (dataset files gone): moved aside, then replaced
+        stale_dir = f'{spec_dir}.{os.getpid()}.stale'
+        try:
+            os.replace(spec_dir, stale_dir)
+        except OSError:  # Another worker moved it first
+            pass
+        shutil.rmtree(stale_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, spec_dir)
+    except OSError:  # Another worker published the same spec first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return spec_dir
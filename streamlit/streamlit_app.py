@@ -1,14 +1,23 @@
 
+import ast
+import os
 import streamlit as st
-import charts as charts
+import data_store
+import artifacts
+import spec_cache
+from chart_config import CHART_CONFIG
 
 st.set_page_config(layout="wide", page_title="NSF Grants Visualization")
 
-st.title("NSF Grants Visualization (2021-2025)")
+# Displayed fiscal years (configured in config.json)
+DASHBOARD_YEARS = data_store.get_dashboard_years()
+YEAR_RANGE = f"{DASHBOARD_YEARS[0]}-{DASHBOARD_YEARS[-1]}"
 
-st.markdown("""
+st.title(f"NSF Grants Visualization ({YEAR_RANGE})")
+
+st.markdown(f"""
 ### Objective
-This project presents an exploratory data visualization analysis of National Science Foundation (NSF) grants from the last 5 years (2021-2025). 
+This project presents an exploratory data visualization analysis of National Science Foundation (NSF) grants from the last {len(DASHBOARD_YEARS)} years ({YEAR_RANGE}). 
 The main aspects treated are the distribution of grants across different states and directorates, the temporal evolution of funding amounts, 
 and the impact of cancelled grants during the Trump administration.
 """)
@@ -16,231 +25,217 @@ and the impact of cancelled grants during the Trump administration.
 st.markdown("---")
 
 # Load Data Functions
-@st.cache_data
-def load_mappings():
-    return charts.get_mappings()
 
-@st.cache_data
-def load_award_data(mappings):
-    return charts.get_award_data(mappings)
+# cache_resource (not cache_data): the memory-mapped frames are shared, never pickled into private copies.
+# Keyed by the bundle version, so publishing a new LATEST switches every worker on its next rerun.
+@st.cache_resource
+def load_bundle_frames(years, version):
+    return artifacts.load_bundle(years, version=version)
+
+def get_budget_quantiles(mappings, years, df_awards=None, df_cancellations=None):
+    import sketches
+    budget_sketches = sketches.build_sketches(mappings, years, df_awards, df_cancellations)
+    return sketches.get_budget_quantiles(budget_sketches)
+
+def get_monthly_series(mappings, years, df_awards=None, df_cancellations=None):
+    import timeseries
+    try:
+        return timeseries.build_monthly_series(mappings, years, df_awards, df_cancellations)
+    except (ValueError, KeyError):  # Award files written before StartDate was captured: yearly charts
+        return None
+
+def get_pandas_frames(mappings, years, time_resolution, loader_threads):
+    # The awards and the cancellations are read once (concurrently), then the frames built from them
+    # (award/state chain, Q2 counts, Q5 cancellations, budget sketches, monthly series) run concurrently.
+    monthly_loaders = [
+        {'name': 'monthly_series', 'deps': ['awards', 'cancellations'],
+         'run': lambda r: get_monthly_series(mappings, years, r['awards'], r['cancellations'])}
+    ] if time_resolution == 'month' else []
+    results, startup_report = loaders.run_loaders([
+        {'name': 'awards', 'deps': [], 'run': lambda r: data_store.read_awards(years)},
+        {'name': 'cancellations', 'deps': [], 'run': lambda r: data_store.read_cancellations()},
+        {'name': 'award_data', 'deps': ['awards', 'cancellations'],
+         'run': lambda r: charts.get_award_data(mappings, years, r['awards'], r['cancellations'])},
+        {'name': 'state_grants', 'deps': ['award_data'], 'run': lambda r: charts.get_state_grants_data(r['award_data'], mappings)},
+        {'name': 'q1', 'deps': ['state_grants'], 'run': lambda r: charts.get_q1_data(r['state_grants'], mappings)},
+        {'name': 'q2', 'deps': ['awards', 'cancellations'],
+         'run': lambda r: charts.get_q2_data(years, r['awards'], r['cancellations'])},
+        {'name': 'q5_cancellations', 'deps': ['cancellations'],
+         'run': lambda r: charts.get_q5_cancellation_data(mappings, years, r['cancellations'])},
+        {'name': 'budget_quantiles', 'deps': ['awards', 'cancellations'],
+         'run': lambda r: get_budget_quantiles(mappings, years, r['awards'], r['cancellations'])}
+    ] + monthly_loaders, max_workers=loader_threads)
+    df_scatter, df_div = results['q2']
+    frames = {
+        'df_complete': results['award_data'],
+        'df_state_grants': results['state_grants'],
+        'q1_combined': results['q1'],
+        'df_scatter': df_scatter,
+        'df_div': df_div,
+        'cancelled_by_state_year': results['q5_cancellations'],
+        'budget_quantiles': results['budget_quantiles']
+    }
+    if results.get('monthly_series') is not None:
+        frames['monthly_series'] = results['monthly_series']
+    return frames, startup_report
+
+# Frames computed by a query backend when there is no bundle. cache_resource, like the bundle: built
+# once per worker and shared by its sessions. With compact=True only the compact frames are kept, and
+# the memory report is computed here, once. Returns (frames, memory report, startup report), the
+# reports being None when not computed.
+@st.cache_resource
+def load_backend_frames(backend, years, compact, chunksize, time_resolution, loader_threads):
+    mappings = charts.get_mappings()
+    startup_report = None
+    if backend == 'duckdb':
+        import duckdb_backend  # Optional dependency, only needed for QUERY_BACKEND = 'duckdb'
+        frames = duckdb_backend.get_dashboard_frames(years)
+    elif backend in ('cube', 'chunked'):
+        import cube
+        frames = cube.get_dashboard_frames(mappings, years, chunksize=chunksize if backend == 'chunked' else None)
+    else:
+        frames, startup_report = get_pandas_frames(mappings, years, time_resolution, loader_threads)
+
+    if 'budget_quantiles' not in frames:
+        # Backends answer the counts and sums; award size quantiles come from the budget sketches
+        frames['budget_quantiles'] = get_budget_quantiles(mappings, years)
+
+    if 'monthly_series' not in frames and time_resolution == 'month':
+        monthly_series = get_monthly_series(mappings, years)
+        if monthly_series is not None:
+            frames['monthly_series'] = monthly_series
+
+    memory_report = None
+    if compact:
+        compact_frames = charts.compact_frames(frames)
+        memory_report = charts.get_memory_report(frames, compact_frames)
+        frames = compact_frames
+    return frames, memory_report, startup_report
+
+# Loaded when the Top Institutions view is opened: from the bundle, or aggregated from the award files
+@st.cache_resource
+def load_institution_stats(years, version):
+    import institutions
+    frames = artifacts.load_bundle(years, version=version, names=['institution_stats']) if version else None
+    if frames is not None:
+        return frames['institution_stats']
+    return institutions.build_institution_stats(years)
 
-@st.cache_data
-def load_state_grants_data(df_complete, mappings):
-    return charts.get_state_grants_data(df_complete, mappings)
+# CONSTANTS
 
-@st.cache_data
-def load_q5_cancellation_data(mappings):
-    return charts.get_q5_cancellation_data(mappings)
+# Constants read with get_setting can be overridden with an environment variable holding a Python
+# literal, e.g. NSF_DASHBOARD_QUERY_BACKEND="'cube'" (scripts/load_test_app.py --set)
+SETTING_PREFIX = 'NSF_DASHBOARD_'
 
-@st.cache_data
-def load_q1(df_state_grants, mappings):
-    return charts.get_q1_data(df_state_grants, mappings)
+def get_setting(name, default):
+    value = os.environ.get(SETTING_PREFIX + name)
+    return default if value is None else ast.literal_eval(value)
 
-@st.cache_data
-def load_q2():
-    return charts.get_q2_data()
+# Chart layout, colors and interaction defaults: chart_config.CHART_CONFIG
 
-# CONSTANTS
+# Compact representation (shared categoricals, narrow ints, float32)
+COMPACT_DTYPES = get_setting('COMPACT_DTYPES', True)
+
+# Aggregation backend: 'pandas', 'cube' (precomputed rollup cube), 'chunked' (rollup cube built from award
+# batches of AWARD_CHUNK_SIZE rows, bounded memory) or 'duckdb' (embedded SQL engine, requires duckdb)
+QUERY_BACKEND = get_setting('QUERY_BACKEND', 'pandas')
+AWARD_CHUNK_SIZE = get_setting('AWARD_CHUNK_SIZE', 100_000)
+
+# Memory-map the prebuilt Arrow bundle (scripts/build_dashboard_artifacts.py) when available
+USE_ARTIFACT_BUNDLE = get_setting('USE_ARTIFACT_BUNDLE', True)
 
-# --- Chart Dimensions ---
-MAP_WIDTH = 450
-MAP_HEIGHT = 300
-MAP_SCALE = int(1.25 * MAP_WIDTH)
-
-BAR_WIDTH = 250
-BAR_HEIGHT = 330
-BAR_CHART_TOP_PADDING = 36
-
-Q5_BAR_HEIGHT = 150
-Q5_WIDTH = BAR_WIDTH + MAP_WIDTH
-Q5_2_WIDTH = MAP_WIDTH + BAR_WIDTH - 20
-
-LINE_CHART_WIDTH = 300
-LINE_CHART_HEIGHT = 275
-
-# Legend
-LEGEND_WIDTH = MAP_WIDTH - 50
-LEGEND_SPACER_WIDTH = (MAP_WIDTH - LEGEND_WIDTH) / 2
-LEGEND_TEXT_HEIGHT = 20
-LEGEND_BAR_HEIGHT = 15
-LEGEND_STEPS = 300
-LEGEND_TICK_COUNT = 6
-
-# Q2 Bubble & Bar
-CHART_WIDTH_BUBBLE = 450
-CHART_HEIGHT_BUBBLE = 400
-CHART_WIDTH_BAR = 275
-CHART_WIDTH_LABEL = 40
-CHART_HEIGHT_BAR = 350
-HEADER_HEIGHT = 30
-FOOTER_HEIGHT = 20
-BUBBLE_HEADER_OFFSET = 4
-BUTTERFLY_HEADER_OFFSET = 2
-
-# --- Colors ---
-COLOR_DEMOCRAT = "#377eb8"
-COLOR_REPUBLICAN = "#e41a1c"
-COLOR_DEMOCRAT_DARK = "#12129E"
-COLOR_REPUBLICAN_DARK = "#8B0000"
-COLOR_STROKE_BLACK = "black"
-COLOR_STROKE_WHITE = "white"
-COLOR_BACKGROUND_MAP = "#e0e0e0"
-COLOR_SCHEME_RATE = "teals"
-COLOR_ALL_PARTY = "#7B1FA2"
-
-# --- Styling ---
-STROKE_WIDTH_THIN = 0.5
-STROKE_WIDTH_THICK = 4
-STROKE_WIDTH_SYMBOL = 5
-
-OPACITY_ACTIVE = 1.0
-OPACITY_INACTIVE = 0.0
-OPACITY_CIRCLE = 0.9
-OPACITY_RULE_OUTLINE = 0.8
-OPACITY_LINE = 0.6
-OPACITY_YEAR_RULE = 0.7
-
-CIRCLE_SIZE = 50
-POINT_SIZE_DEFAULT = 80
-POINT_SIZE_SELECTED = 100
-POINT_SIZE_UNSELECTED = 50
-
-# --- Offsets ---
-PARTY_LEGEND_OFFSET_Y = -40
-MEAN_LEGEND_OFFSET = -30
-Q4_HEIGHT_OFFSET = 52
-
-# --- Interaction Defaults ---
-TOP_N_MIN = 5
-TOP_N_MAX = 15
-TOP_N_STEP = 1
-DEFAULT_TOP_N = 10
-
-YEARS_LIST = [2021, 2022, 2023, 2024, 2025]
-YEAR_DEFAULT = 2025  # Default year shown when "All Years" is selected
-
-VCONCAT_SPACING = 20
-HCONCAT_SPACING = 30
-BOTTOM_SPACING = 40
-DASHBOARD_TITLE_FONT_SIZE = 20
-DASHBOARD_SUBTITLE_FONT_SIZE = 12
-DASHBOARD_TITLE_OFFSET = 20
-
-PALETTE_DIRECTORATES = [
-    '#E69F00', '#56B4E9', '#8D6E63', '#F0E442', '#0072B2',
-    '#D55E00', '#CC79A7', '#999999', '#000000'
-]
-COLOR_VOLUME = '#00897B'
-COLOR_IMPACT = '#AD1457'
-COLOR_GRAY = 'lightgray'
-
-OPACITY_DIM = 0.1
-LEGEND_TITLE_FONT_SIZE = 14
-LEGEND_LABEL_FONT_SIZE = 12
-LEGEND_SYMBOL_SIZE = 60
-LEGEND_ROW_PADDING = 5
-
-STEP_BUBBLE_X = 200
-STEP_BAR_X = 500
-STEP_RATE = 2
-MIN_BAR_GRANTS = 25
-MIN_BAR_RATE = 0
-YEAR_ALL_INDICATOR = 0
-
-CHART_CONFIG = {
-    'MAP_WIDTH': MAP_WIDTH,
-    'MAP_HEIGHT': MAP_HEIGHT,
-    'MAP_SCALE': MAP_SCALE,
-    'BAR_WIDTH': BAR_WIDTH,
-    'BAR_HEIGHT': BAR_HEIGHT,
-    'BAR_CHART_TOP_PADDING': BAR_CHART_TOP_PADDING,
-    'Q5_BAR_HEIGHT': Q5_BAR_HEIGHT,
-    'Q5_WIDTH': Q5_WIDTH,
-    'Q5_2_WIDTH': Q5_2_WIDTH,
-    'LINE_CHART_WIDTH': LINE_CHART_WIDTH,
-    'LINE_CHART_HEIGHT': LINE_CHART_HEIGHT,
-    'LEGEND_WIDTH': LEGEND_WIDTH,
-    'LEGEND_SPACER_WIDTH': LEGEND_SPACER_WIDTH,
-    'LEGEND_TEXT_HEIGHT': LEGEND_TEXT_HEIGHT,
-    'LEGEND_BAR_HEIGHT': LEGEND_BAR_HEIGHT,
-    'LEGEND_STEPS': LEGEND_STEPS,
-    'LEGEND_TICK_COUNT': LEGEND_TICK_COUNT,
-    'CHART_WIDTH_BUBBLE': CHART_WIDTH_BUBBLE,
-    'CHART_HEIGHT_BUBBLE': CHART_HEIGHT_BUBBLE,
-    'CHART_WIDTH_BAR': CHART_WIDTH_BAR,
-    'CHART_WIDTH_LABEL': CHART_WIDTH_LABEL,
-    'CHART_HEIGHT_BAR': CHART_HEIGHT_BAR,
-    'HEADER_HEIGHT': HEADER_HEIGHT,
-    'FOOTER_HEIGHT': FOOTER_HEIGHT,
-    'BUBBLE_HEADER_OFFSET': BUBBLE_HEADER_OFFSET,
-    'BUTTERFLY_HEADER_OFFSET': BUTTERFLY_HEADER_OFFSET,
-    'COLOR_DEMOCRAT': COLOR_DEMOCRAT,
-    'COLOR_REPUBLICAN': COLOR_REPUBLICAN,
-    'COLOR_DEMOCRAT_DARK': COLOR_DEMOCRAT_DARK,
-    'COLOR_REPUBLICAN_DARK': COLOR_REPUBLICAN_DARK,
-    'COLOR_STROKE_BLACK': COLOR_STROKE_BLACK,
-    'COLOR_STROKE_WHITE': COLOR_STROKE_WHITE,
-    'COLOR_BACKGROUND_MAP': COLOR_BACKGROUND_MAP,
-    'COLOR_SCHEME_RATE': COLOR_SCHEME_RATE,
-    'COLOR_ALL_PARTY': COLOR_ALL_PARTY,
-    'COLOR_VOLUME': COLOR_VOLUME,
-    'COLOR_IMPACT': COLOR_IMPACT,
-    'COLOR_GRAY': COLOR_GRAY,
-    'PALETTE_DIRECTORATES': PALETTE_DIRECTORATES,
-    'STROKE_WIDTH_THIN': STROKE_WIDTH_THIN,
-    'STROKE_WIDTH_THICK': STROKE_WIDTH_THICK,
-    'STROKE_WIDTH_SYMBOL': STROKE_WIDTH_SYMBOL,
-    'OPACITY_ACTIVE': OPACITY_ACTIVE,
-    'OPACITY_DIM': OPACITY_DIM,
-    'OPACITY_INACTIVE': OPACITY_INACTIVE,
-    'OPACITY_CIRCLE': OPACITY_CIRCLE,
-    'OPACITY_RULE_OUTLINE': OPACITY_RULE_OUTLINE,
-    'OPACITY_LINE': OPACITY_LINE,
-    'OPACITY_YEAR_RULE': OPACITY_YEAR_RULE,
-    'CIRCLE_SIZE': CIRCLE_SIZE,
-    'POINT_SIZE_DEFAULT': POINT_SIZE_DEFAULT,
-    'POINT_SIZE_SELECTED': POINT_SIZE_SELECTED,
-    'POINT_SIZE_UNSELECTED': POINT_SIZE_UNSELECTED,
-    'PARTY_LEGEND_OFFSET_Y': PARTY_LEGEND_OFFSET_Y,
-    'MEAN_LEGEND_OFFSET': MEAN_LEGEND_OFFSET,
-    'LEGEND_TITLE_FONT_SIZE': LEGEND_TITLE_FONT_SIZE,
-    'LEGEND_LABEL_FONT_SIZE': LEGEND_LABEL_FONT_SIZE,
-    'LEGEND_SYMBOL_SIZE': LEGEND_SYMBOL_SIZE,
-    'LEGEND_ROW_PADDING': LEGEND_ROW_PADDING,
-    'Q4_HEIGHT_OFFSET': Q4_HEIGHT_OFFSET,
-    'TOP_N_MIN': TOP_N_MIN,
-    'TOP_N_MAX': TOP_N_MAX,
-    'TOP_N_STEP': TOP_N_STEP,
-    'DEFAULT_TOP_N': DEFAULT_TOP_N,
-    'YEARS_LIST': YEARS_LIST,
-    'YEAR_DEFAULT': YEAR_DEFAULT,
-    'YEAR_ALL_INDICATOR': YEAR_ALL_INDICATOR,
-    'VCONCAT_SPACING': VCONCAT_SPACING,
-    'HCONCAT_SPACING': HCONCAT_SPACING,
-    'BOTTOM_SPACING': BOTTOM_SPACING,
-    'DASHBOARD_TITLE_FONT_SIZE': DASHBOARD_TITLE_FONT_SIZE,
-    'DASHBOARD_SUBTITLE_FONT_SIZE': DASHBOARD_SUBTITLE_FONT_SIZE,
-    'DASHBOARD_TITLE_OFFSET': DASHBOARD_TITLE_OFFSET,
-    'STEP_BUBBLE_X': STEP_BUBBLE_X,
-    'STEP_BAR_X': STEP_BAR_X,
-    'STEP_RATE': STEP_RATE,
-    'MIN_BAR_GRANTS': MIN_BAR_GRANTS,
-    'MIN_BAR_RATE': MIN_BAR_RATE
-}
+# Serve the chart spec cached for the bundle version (clean_data/dashboard/specs/): a cold worker
+# then renders the chart without importing pandas, Altair or the chart code
+USE_SPEC_CACHE = get_setting('USE_SPEC_CACHE', True)
+SPEC_CACHE_DIR = get_setting('SPEC_CACHE_DIR', spec_cache.SPECS_DIR)
+
+# Write the chart datasets once to content-hashed JSON files under streamlit/static/ and reference
+# them by URL, so browsers and proxies cache them across page loads and the spec shrinks to a few KB.
+# Requires static file serving (server.enableStaticServing, .streamlit/config.toml); inlined otherwise.
+EXTERNAL_CHART_DATA = get_setting('EXTERNAL_CHART_DATA', True)
+CHART_DATA_DIR = get_setting('CHART_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'chart_data'))
+CHART_DATA_URL = 'app/static/chart_data'
+
+# Concurrent startup loaders (pandas backend)
+LOADER_THREADS = get_setting('LOADER_THREADS', 4)
+
+YEARS_LIST = DASHBOARD_YEARS
 
 # Execute Data Loading
-mappings = load_mappings()
-df_complete = load_award_data(mappings)
-df_state_grants = load_state_grants_data(df_complete, mappings)
-q1_combined = load_q1(df_state_grants, mappings)
-df_scatter, df_div = load_q2()
-cancelled_by_state_year = load_q5_cancellation_data(mappings)
+memory_report = None
+startup_report = None
+bundle_version = artifacts.get_latest_version() if USE_ARTIFACT_BUNDLE else None
+external_data = EXTERNAL_CHART_DATA and st.get_option('server.enableStaticServing')
+external_spec = None
+cached_spec = spec_cache.read_spec(bundle_version, SPEC_CACHE_DIR, external=external_data) if bundle_version and USE_SPEC_CACHE else None
 
 @st.cache_data
-def load_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, config):
-    return charts.get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, config)
+def load_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, config,
+                       combined_q4=None, combined_q5_with_states=None, q5_segments=None, budget_quantiles=None,
+                       monthly_series=None):
+    return charts.get_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, config,
+                                    combined_q4, combined_q5_with_states, q5_segments, budget_quantiles, monthly_series)
 
-visualization = load_visualization(df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, CHART_CONFIG)
+# chart.to_dict() is the slowest step of a rerun: the external spec is cached with the frames it is built from
+@st.cache_data
+def load_external_spec(data_dir, urlpath, *visualization_args):
+    import chart_data
+    return chart_data.get_external_spec(load_visualization(*visualization_args), data_dir, urlpath)
+
+# Written once per bundle version and worker (a read-only data directory just leaves the cache empty)
+@st.cache_resource
+def store_spec(version, external, _visualization, _external_spec=None):
+    try:
+        if external:
+            import chart_data
+            files = chart_data.get_dataset_paths(_external_spec, CHART_DATA_DIR)
+            spec_cache.write_spec(version, _external_spec, SPEC_CACHE_DIR, external=True, files=files)
+        else:
+            spec_cache.write_spec(version, _visualization.to_dict(), SPEC_CACHE_DIR)
+    except OSError:
+        pass
+
+if cached_spec is None:
+    # Chart-construction stack (pandas, Altair, chart code), only needed when the spec is not cached
+    import charts
+    import loaders
+
+    frames = load_bundle_frames(YEARS_LIST, bundle_version) if bundle_version else None
+    from_bundle = frames is not None
+
+    if frames is None:  # Computed by the query backend (bundles are already stored compact)
+        frames, memory_report, startup_report = load_backend_frames(QUERY_BACKEND, YEARS_LIST, COMPACT_DTYPES, AWARD_CHUNK_SIZE,
+                                                                    CHART_CONFIG['TIME_RESOLUTION'], LOADER_THREADS)
+
+    # Bundles and backends precompute the Q4/Q5.1 frames, so df_complete is only needed by the pandas path
+    df_complete = frames.get('df_complete')
+    df_state_grants = frames['df_state_grants']
+    q1_combined = frames['q1_combined']
+    df_scatter = frames['df_scatter']
+    df_div = frames['df_div']
+    cancelled_by_state_year = frames['cancelled_by_state_year']
+    combined_q4 = frames.get('combined_q4')
+    combined_q5_with_states = frames.get('combined_q5_with_states')
+    q5_segments = frames.get('q5_segments')
+    budget_quantiles = frames.get('budget_quantiles')
+    monthly_series = frames.get('monthly_series')
+
+    visualization_args = (df_complete, df_state_grants, df_scatter, df_div, q1_combined, cancelled_by_state_year, CHART_CONFIG,
+                          combined_q4, combined_q5_with_states, q5_segments, budget_quantiles, monthly_series)
+    visualization = load_visualization(*visualization_args)
+
+    if external_data:
+        import chart_data
+        try:
+            external_spec = load_external_spec(CHART_DATA_DIR, CHART_DATA_URL, *visualization_args)
+            if not all(os.path.exists(path) for path in chart_data.get_dataset_paths(external_spec, CHART_DATA_DIR)):
+                load_external_spec.clear()  # Dataset files removed (cleanup, redeploy): written again
+                external_spec = load_external_spec(CHART_DATA_DIR, CHART_DATA_URL, *visualization_args)
+        except OSError:  # Read-only app directory: datasets stay inlined
+            external_data = False
+
+    if from_bundle and USE_SPEC_CACHE:
+        store_spec(bundle_version, external_data, visualization, external_spec)
 
 # CSS to hide chart during initial render, then fade in after delay
 
@@ -284,7 +279,45 @@ st.markdown("""
 <div class="loading-msg">⏳ Loading visualization...</div>
 """, unsafe_allow_html=True)
 
-st.altair_chart(visualization, width='content')
+if cached_spec is not None:
+    st.vega_lite_chart(cached_spec, width='content')
+elif external_spec is not None:
+    st.vega_lite_chart(external_spec, width='content')
+else:
+    st.altair_chart(visualization, width='content')
+
+with st.expander("🏛️ Top Institutions", expanded=False):
+    if st.toggle("Show institution rankings", value=False):
+        import institutions
+        try:
+            institution_stats = load_institution_stats(YEARS_LIST, bundle_version)
+        except ValueError:
+            institution_stats = None
+            st.warning("The award files have no institution columns: rerun scripts/process_awards.py.")
+
+        if institution_stats is not None:
+            col_state, col_dir, col_year, col_by = st.columns(4)
+            state = col_state.selectbox("State", ['All'] + sorted(institution_stats['StateCode'].dropna().unique()))
+            directorate = col_dir.selectbox("Directorate", ['All'] + sorted(institution_stats['DirectorateAbbr'].dropna().unique()))
+            year = col_year.selectbox("Year", ['All'] + YEARS_LIST)
+            by = col_by.selectbox("Rank by", institutions.RANKING_COLUMNS)
+            top_n = st.slider("Top N", min_value=5, max_value=50, value=10, step=5)
+
+            st.dataframe(institutions.get_top_institutions(
+                institution_stats, top_n, by,
+                years=None if year == 'All' else [year],
+                states=None if state == 'All' else [state],
+                directorates=None if directorate == 'All' else [directorate]
+            ), hide_index=True)
+
+if memory_report is not None:
+    with st.expander("📦 Memory Footprint", expanded=False):
+        st.dataframe(memory_report, hide_index=True)
+
+if startup_report is not None:
+    with st.expander("⏱️ Startup Loaders", expanded=False):
+        st.caption("Loaders on the critical path determine the startup time; the others overlap with them.")
+        st.dataframe(startup_report, hide_index=True)
 
 with st.expander("ℹ️ Authors", expanded=False):
     st.markdown(
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import charts
+import data_store
+
+# Monthly series of the awards by state x party x directorate x month of the award start date
+# (StartDate: effective date of the award, cancellation start date for cancelled grants missing
+# from the awards), holding grant counts and budget sums. Months belong to a fiscal year (Oct 1 -
+# Sep 30, Year), which also sets the governing party. Awards without a start date are left out.
+#
+# The line charts read these series downsampled with Largest-Triangle-Three-Buckets (LTTB): at most
+# `max_points` points per line, keeping the first and last points and the peaks and dips that
+# give the line its shape, so longer time spans do not grow the spec or the render time.
+
+SERIES_DIMENSIONS = ['StateCode', 'StateName', 'Party', 'DirectorateAbbr', 'Year', 'Month']
+AWARD_COLUMNS = ['AwardID', 'StateCode', 'DirectorateAbbr', 'Year', 'StartDate', 'EstimatedBudget']
+
+ALL_STATES = 'All States (Avg)'
+
+
+# BUILD
+
+def get_fiscal_years(months):
+    return months.dt.year + (months.dt.month >= 10).astype(int)
+
+def get_monthly_series(facts, mappings, years):
+    # Fact rows (one per grant) -> series rows
+    facts = facts.assign(Month=pd.to_datetime(facts['StartDate'], errors='coerce').dt.to_period('M').dt.to_timestamp())
+    facts = facts[facts['Month'].notna()]
+    facts = facts.assign(Year=get_fiscal_years(facts['Month']))
+    facts = facts[facts['Year'].isin(years)]
+
+    facts = facts.assign(
+        StateName=facts['StateCode'].map(mappings['state_name']),
+        Party=charts.get_parties(facts['StateCode'], facts['Year'], mappings)  # Fiscal year of the month
+    )
+    return facts.groupby(SERIES_DIMENSIONS, dropna=False, observed=True).agg(
+        Grants=('Month', 'size'),
+        Budget=('EstimatedBudget', 'sum')
+    ).reset_index()
+
+def merge_series(series):
+    series = pd.concat(series, ignore_index=True)
+    return series.groupby(SERIES_DIMENSIONS, dropna=False, observed=True)[['Grants', 'Budget']].sum().reset_index()
+
+def build_monthly_series(mappings, years=None, df_awards=None, df_cancellations=None, chunksize=100_000):
+    # Raises ValueError / KeyError when the award or cancellation files have no StartDate column
+    # (written before it was captured)
+    if years is None:
+        years = data_store.get_dashboard_years()
+    df_cancellations, in_awards, batches = data_store.scan_awards(years, AWARD_COLUMNS, df_awards, df_cancellations, chunksize)
+
+    series = [get_monthly_series(batch, mappings, years) for batch in batches]
+    missing = data_store.get_missing_cancellations(df_cancellations, in_awards)
+    series.append(get_monthly_series(missing[AWARD_COLUMNS], mappings, years))
+    return merge_series(series)
+
+
+# DOWNSAMPLING
+
+def get_lttb_indices(x, y, max_points):
+    # Positions of the points kept by LTTB (x sorted): the first and last points, and in each of
+    # max_points - 2 buckets the point forming the largest triangle with the previously kept point
+    # and the average of the next bucket
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    edges = (np.arange(max_points - 1) * (n - 2) / (max_points - 2)).astype(int) + 1
+    edges[-1] = n - 1
+
+    kept = np.empty(max_points, dtype=np.intp)
+    kept[0] = 0
+    kept[-1] = n - 1
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        a = kept[i]
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        kept[i + 1] = start + int(np.argmax(areas))
+    return kept
+
+def downsample_series(df, x, y, by, max_points):
+    # At most max_points rows per `by` line (x: datetime column, ordered within each line)
+    df = df.sort_values(by + [x], ignore_index=True)
+    x_values = df[x].to_numpy('datetime64[ns]').astype('int64')
+    y_values = df[y].to_numpy('float64')
+    rows = [
+        positions[get_lttb_indices(x_values[positions], y_values[positions], max_points)]
+        for positions in df.groupby(by, observed=True, sort=False).indices.values()
+    ]
+    return df.iloc[np.sort(np.concatenate(rows))].reset_index(drop=True) if rows else df
+
+
+# CHART FRAMES (Q4 / Q5.1 at monthly resolution)
+
+def get_budget_series(series, max_points):
+    # Total budget per month (All) and per month and party, like charts.get_q4_data
+    monthly_totals = series.groupby('Month', observed=True).agg(TotalBudget=('Budget', 'sum')).reset_index()
+    monthly_totals['Group'] = 'All'
+
+    monthly_party_totals = series.groupby(['Month', 'Party'], observed=True).agg(TotalBudget=('Budget', 'sum')).reset_index()
+    monthly_party_totals['Group'] = monthly_party_totals['Party'].astype('object')
+
+    budget_series = pd.concat([monthly_totals, monthly_party_totals], ignore_index=True)
+    budget_series['Year'] = get_fiscal_years(budget_series['Month'])
+    return downsample_series(budget_series, 'Month', 'TotalBudget', ['Group'], max_points)
+
+def get_state_series(series, max_points):
+    # Grants per state and month and their average over the states, like charts.get_q5_evolution_data
+    by_state = series.groupby(['StateCode', 'StateName', 'Party', 'Month'], observed=True).agg(GrantCount=('Grants', 'sum')).reset_index()
+    by_state = by_state.astype({'StateCode': 'object', 'StateName': 'object', 'Party': 'object'})
+    by_state['Group'] = by_state['Party']
+
+    all_avg = by_state.groupby('Month', observed=True).agg(GrantCount=('GrantCount', 'mean')).reset_index()
+    all_avg['Group'] = 'All'
+    all_avg['StateName'] = ALL_STATES
+
+    state_series = pd.concat([
+        all_avg[['Month', 'Group', 'GrantCount', 'StateName']],
+        by_state[['Month', 'Group', 'GrantCount', 'StateName', 'StateCode', 'Party']]
+    ], ignore_index=True)
+    state_series['Year'] = get_fiscal_years(state_series['Month'])
+    return downsample_series(state_series, 'Month', 'GrantCount', ['StateName'], max_points)
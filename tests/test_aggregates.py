@@ -0,0 +1,286 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit"))
+sys.path.insert(0, os.path.join(PROJECT_DIR, "scripts"))
+import build_dashboard_artifacts
+import charts
+import cube
+import data_store
+import institutions
+import pipeline
+import sketches
+import spec_cache
+import timeseries
+
+# Equivalence checks of the aggregation paths on a small synthetic clean_data/ (a few states,
+# directorates and fiscal years, cancelled grants in and missing from the awards): the query
+# backends against the pandas frames, batched scans against in-memory ones, a cancellation delta
+# against a full rebuild, plus the sketch accuracy, LTTB and cache invalidation guarantees.
+#
+#   python -m pytest tests
+
+YEARS = [2023, 2024, 2025]  # 2025: parties of the 2024 elections
+STATES = ['AZ', 'CA', 'GA', 'NY', 'PA', 'TX']
+DIVISIONS = {
+    # abbreviation: (directorate, division)
+    'BIO': ('Biological Sciences', 'Molecular and Cellular Biosciences', 'MCB'),
+    'CSE': ('Computer and Information Science and Engineering', 'Computing and Communication Foundations', 'CCF'),
+    'ENG': ('Engineering', 'Civil, Mechanical and Manufacturing Innovation', 'CMMI'),
+    'EDU': ('STEM Education', 'Research on Learning in Formal and Informal Settings', 'DRL')
+}
+CHUNKSIZE = 50  # Several award batches per partition
+
+
+# FIXTURES
+
+def make_awards(rng, state_names, n=400):
+    directorates = rng.choice(list(DIVISIONS), n)
+    years = rng.choice(YEARS, n)
+    months = rng.integers(0, 12, n)
+    start_dates = [
+        pd.Timestamp(year - 1, 10, 1) + pd.DateOffset(months=int(month), days=int(day))
+        for year, month, day in zip(years, months, rng.integers(0, 28, n))
+    ]
+    institution_ids = rng.choice(['UEI1', 'UEI2', 'UEI3', 'UEI4', None], n)
+    state_codes = rng.choice(STATES, n)
+    df_awards = pd.DataFrame({
+        'AwardID': 2300000 + np.arange(n),
+        'Directorate': [DIVISIONS[abbr][0] for abbr in directorates],
+        'DirectorateAbbr': directorates,
+        'Division': [DIVISIONS[abbr][1] for abbr in directorates],
+        'DivisionAbbr': [DIVISIONS[abbr][2] for abbr in directorates],
+        'StateCode': state_codes,
+        'StateName': [state_names[code] for code in state_codes],
+        'InstitutionID': institution_ids,
+        'Institution': [f'University {uei or "X"}' for uei in institution_ids],
+        'Year': years,
+        'StartDate': [date.strftime('%Y-%m-%d') for date in start_dates],
+        'EstimatedBudget': np.round(rng.lognormal(13, 1.2, n))
+    })
+    df_awards.loc[:2, 'EstimatedBudget'] = [0.0, 0.5, 1.0]  # Zero bucket
+    return df_awards
+
+def make_cancellations(rng, df_awards, n=60):
+    cancelled = df_awards.sample(n, random_state=1)
+    df_cancellations = pd.DataFrame({
+        'AwardID': cancelled['AwardID'],
+        'Status': rng.choice(['Terminated', 'Reinstated'], n, p=[0.8, 0.2]),
+        'Year': cancelled['Year'],
+        'StartDate': cancelled['StartDate'],
+        'StateCode': cancelled['StateCode'],
+        'EstimatedBudget': cancelled['EstimatedBudget'],
+        'Directorate': cancelled['Directorate'],
+        'DirectorateAbbr': cancelled['DirectorateAbbr'],
+        'Division': cancelled['Division'],
+        'DivisionAbbr': cancelled['DivisionAbbr']
+    })
+    # A grant listed twice, and cancelled grants missing from the awards (with and without a state)
+    missing = df_cancellations.head(6).assign(AwardID=2900000 + np.arange(6), Division=None, DivisionAbbr=None)
+    missing.loc[missing.index[:2], 'StateCode'] = None
+    return pd.concat([df_cancellations, df_cancellations.head(1), missing], ignore_index=True)
+
+@pytest.fixture
+def project_dir(tmp_path, monkeypatch):
+    # clean_data/ with the award partitions, the cancellations and the states; the dashboard
+    # modules read clean_data/ relative to the working directory
+    rng = np.random.default_rng(0)
+    data_dir = tmp_path / data_store.CLEAN_DATA_DIR
+    data_dir.mkdir()
+    shutil.copy(os.path.join(PROJECT_DIR, 'clean_data', 'us_states.csv'), data_dir / 'us_states.csv')
+    df_states = pd.read_csv(data_dir / 'us_states.csv')
+
+    df_awards = make_awards(rng, dict(zip(df_states['StateCode'], df_states['StateName'])))
+    for year in YEARS:
+        data_store.write_award_partition(df_awards[df_awards['Year'] == year], year, str(data_dir))
+    make_cancellations(rng, df_awards).to_csv(data_dir / data_store.CANCELLATIONS_FILE, index=False)
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def normalize(df, columns, sort_by):
+    # Same rows regardless of row order, categorical dtypes and integer / float widths
+    df = df[columns]
+    df = df.astype({col: 'object' for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    return df.sort_values(sort_by, ignore_index=True)
+
+def assert_same_rows(left, right):
+    assert sorted(map(str, left.columns)) == sorted(map(str, right.columns))
+    columns = list(left.columns)
+    keys = [col for col in columns if not pd.api.types.is_float_dtype(left[col])]  # Float columns last
+    sort_by = keys + [col for col in columns if col not in keys]
+    pd.testing.assert_frame_equal(normalize(left, columns, sort_by), normalize(right, columns, sort_by), check_dtype=False)
+
+def get_pandas_frames(mappings):
+    df_awards = data_store.read_awards(YEARS)
+    df_cancellations = data_store.read_cancellations()
+    df_complete = charts.get_award_data(mappings, YEARS, df_awards, df_cancellations)
+    df_state_grants = charts.get_state_grants_data(df_complete, mappings)
+    df_scatter, df_div = charts.get_q2_data(YEARS, df_awards, df_cancellations)
+    return {
+        'df_state_grants': df_state_grants,
+        'q1_combined': charts.get_q1_data(df_state_grants.copy(), mappings),
+        'df_scatter': df_scatter,
+        'df_div': df_div,
+        'cancelled_by_state_year': charts.get_q5_cancellation_data(mappings, YEARS, df_cancellations),
+        'combined_q4': charts.get_q4_data(df_complete)
+    }
+
+
+# QUERY BACKENDS
+
+@pytest.mark.parametrize('chunksize', [None, CHUNKSIZE])
+def test_cube_matches_pandas(project_dir, chunksize):
+    mappings = charts.get_mappings()
+    expected = get_pandas_frames(mappings)
+    frames = cube.get_dashboard_frames(mappings, YEARS, chunksize=chunksize)
+    for name, df in expected.items():
+        assert_same_rows(df, frames[name])
+
+def test_duckdb_matches_pandas(project_dir):
+    pytest.importorskip('duckdb')
+    import duckdb_backend
+    expected = get_pandas_frames(charts.get_mappings())
+    frames = duckdb_backend.get_dashboard_frames(YEARS)
+    for name, df in expected.items():
+        assert_same_rows(df, frames[name])
+
+def test_scans_match_in_memory(project_dir):
+    # Award files streamed in batches give the same aggregates as the frames in memory
+    mappings = charts.get_mappings()
+    df_awards = data_store.read_awards(YEARS)
+    df_cancellations = data_store.read_cancellations()
+    pairs = [
+        (sketches.build_sketches(mappings, YEARS, df_awards, df_cancellations),
+         sketches.build_sketches(mappings, YEARS, chunksize=CHUNKSIZE)),
+        (institutions.build_institution_stats(YEARS, df_awards, df_cancellations),
+         institutions.build_institution_stats(YEARS, chunksize=CHUNKSIZE)),
+        (timeseries.build_monthly_series(mappings, YEARS, df_awards, df_cancellations),
+         timeseries.build_monthly_series(mappings, YEARS, chunksize=CHUNKSIZE))
+    ]
+    for in_memory, batched in pairs:
+        assert_same_rows(in_memory, batched)
+
+
+# CANCELLATION DELTAS
+
+def test_delta_matches_full_build(project_dir):
+    # Three grants change status, one is removed and one is added: the delta applied to the frames
+    # of the previous cancellations gives the frames of a full build on the new ones
+    frames = build_dashboard_artifacts.build_frames(YEARS)
+    df_stored = data_store.read_cancellations()
+    df_awards = data_store.read_awards(YEARS)
+
+    in_awards = df_stored[df_stored['AwardID'].isin(df_awards['AwardID'])].drop_duplicates('AwardID', keep=False)
+    changed = in_awards[in_awards['Status'] == 'Terminated']['AwardID'].head(3).tolist()
+    removed = in_awards['AwardID'].iloc[-1]
+    added = df_awards[~df_awards['AwardID'].isin(df_stored['AwardID'])].iloc[0]
+
+    df_new = df_stored[df_stored['AwardID'] != removed].copy()
+    df_new.loc[df_new['AwardID'].isin(changed), 'Status'] = 'Reinstated'
+    df_new = pd.concat([df_new, pd.DataFrame([{
+        **added[['AwardID', 'Year', 'StartDate', 'StateCode', 'EstimatedBudget', 'Directorate',
+                 'DirectorateAbbr', 'Division', 'DivisionAbbr']].to_dict(),
+        'Status': 'Terminated'
+    }])[df_stored.columns]], ignore_index=True)
+    df_new.to_csv(os.path.join(data_store.CLEAN_DATA_DIR, data_store.CANCELLATIONS_FILE), index=False)
+
+    stale = df_stored['AwardID'].isin(changed + [removed])
+    fresh = df_new['AwardID'].isin(changed + [added['AwardID']])
+    delta = pd.concat([df_stored[stale].assign(Sign=-1), df_new[fresh].assign(Sign=1)], ignore_index=True)
+
+    updated = build_dashboard_artifacts.apply_cancellation_delta(frames, delta, YEARS)
+    assert updated is not None
+    full = build_dashboard_artifacts.build_frames(YEARS)
+    for name in ['cancelled_by_state_year', 'df_scatter', 'df_div', 'budget_sketches', 'budget_quantiles', 'institution_stats']:
+        assert_same_rows(full[name], updated[name])
+
+def test_delta_needs_rebuild_for_missing_grants(project_dir):
+    # A cancelled grant missing from the awards also counts as a grant: the delta does not apply
+    frames = build_dashboard_artifacts.build_frames(YEARS)
+    delta = data_store.read_cancellations().tail(1).assign(AwardID=2999999, StateCode='CA', Sign=1)
+    assert build_dashboard_artifacts.apply_cancellation_delta(frames, delta, YEARS) is None
+
+
+# SKETCHES AND DOWNSAMPLING
+
+def test_sketch_quantiles_within_accuracy(project_dir):
+    mappings = charts.get_mappings()
+    df_awards = data_store.read_awards(YEARS)
+    budget_sketches = sketches.build_sketches(mappings, YEARS, df_awards, data_store.read_cancellations().head(0))
+    quantiles = sketches.get_quantiles(budget_sketches, ['DirectorateAbbr'])
+
+    for row in quantiles.itertuples():
+        budgets = df_awards.loc[df_awards['DirectorateAbbr'] == row.DirectorateAbbr, 'EstimatedBudget']
+        assert row.Awards == len(budgets)
+        for name, q in sketches.QUANTILES.items():
+            exact = np.quantile(budgets, q, method='lower')  # Rank floor(q * (n - 1)), as get_quantiles
+            assert abs(getattr(row, name) - exact) <= sketches.RELATIVE_ACCURACY * exact + 1
+
+def test_budget_quantiles_rollups(project_dir):
+    budget_sketches = sketches.build_sketches(charts.get_mappings(), YEARS)
+    quantiles = sketches.get_budget_quantiles(budget_sketches)
+    assert {'All', 'CA'} <= set(quantiles['StateCode'])
+    assert {0, *YEARS} == set(quantiles['Year'])
+
+    # Rollups merge the cell sketches: the award counts add up
+    all_rows = quantiles[(quantiles['StateCode'] == 'All') & (quantiles['Party'] == 'All') & (quantiles['Year'] == 0)]
+    state_rows = quantiles[(quantiles['StateCode'] != 'All') & (quantiles['Party'] == 'All') & (quantiles['Year'] == 0)]
+    assert all_rows['Awards'].sum() == state_rows['Awards'].sum()
+
+def test_lttb_keeps_endpoints_and_extrema():
+    rng = np.random.default_rng(0)
+    y = rng.normal(0, 1, 1000)
+    y[[137, 642]] = [50, -50]
+    kept = timeseries.get_lttb_indices(np.arange(1000), y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert {137, 642} <= set(kept)
+    assert np.array_equal(timeseries.get_lttb_indices(np.arange(10), y[:10], 100), np.arange(10))
+
+
+# CACHE INVALIDATION
+
+def test_pipeline_reruns_stage_when_output_is_gone(project_dir):
+    output = os.path.join(data_store.CLEAN_DATA_DIR, 'output.csv')
+    never_written = os.path.join(data_store.CLEAN_DATA_DIR, 'never_written.csv')
+    stage = {'name': 'stage', 'outputs': [output, never_written]}
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('x\n')
+
+    # Only the outputs the run wrote are required
+    pipeline.save_result('stage', 'fingerprint', None, [output])
+    assert pipeline.is_cached(stage, 'fingerprint')
+    assert not pipeline.is_cached(stage, 'changed fingerprint')
+    os.remove(output)
+    assert not pipeline.is_cached(stage, 'fingerprint')
+
+def test_spec_cache_replaces_entries_with_missing_files(project_dir):
+    specs_dir = str(project_dir / 'specs')
+    dataset_file = str(project_dir / 'data.json')
+    with open(dataset_file, 'w', encoding='utf-8') as f:
+        f.write('[]')
+    spec = {'mark': 'point', 'datasets': {'data': [{'x': 1, 'y': 2.5}]}}
+
+    spec_cache.write_spec('v1', spec, specs_dir, external=True, files=[dataset_file])
+    cached = spec_cache.read_spec('v1', specs_dir, external=True)
+    assert cached['mark'] == 'point'
+    assert cached['datasets']['data'] == spec_cache.get_arrow_bytes(spec['datasets']['data'])
+    assert spec_cache.read_spec('v2', specs_dir, external=True) is None
+
+    # Dataset file removed (e.g. redeploy): the entry is not served, and is replaced when rewritten
+    os.remove(dataset_file)
+    assert spec_cache.read_spec('v1', specs_dir, external=True) is None
+    spec_cache.write_spec('v1', {**spec, 'mark': 'line'}, specs_dir, external=True, files=[dataset_file])
+    with open(dataset_file, 'w', encoding='utf-8') as f:
+        f.write('[]')
+    assert spec_cache.read_spec('v1', specs_dir, external=True)['mark'] == 'line'